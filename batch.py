@@ -0,0 +1,88 @@
+"""Streaming batch evaluation: one expression per input line, one result per output line"""
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from engine import DEFAULT_PRECISION, ERROR_DIVISION, ERROR_INPUT, format_result, make_context, result_places
+from expression import compiler
+
+ERROR_MESSAGES = {
+    ERROR_DIVISION: "Division by zero!",
+    ERROR_INPUT: "Invalid input!"
+}
+
+
+def evaluate_line(line, context, places):
+    """Result text for one line, same semantics and formatting as the calculator"""
+    line = line.strip()
+    if not line:
+        return ""
+    try:
+        return format_result(compiler.evaluate(line, context), places)
+    except ZeroDivisionError:
+        return f"Error: {ERROR_MESSAGES[ERROR_DIVISION]}"
+    except (ValueError, ArithmeticError):
+        return f"Error: {ERROR_MESSAGES[ERROR_INPUT]}"
+
+
+def evaluate_chunk(lines, precision=DEFAULT_PRECISION):
+    """Evaluate a list of lines (runs in worker processes)"""
+    context = make_context(precision)
+    places = result_places(precision)
+    return [evaluate_line(line, context, places) for line in lines]
+
+
+def iter_chunks(stream, chunk_size):
+    """Read lines lazily in lists of chunk_size"""
+    while True:
+        chunk = list(islice(stream, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(stream, out, workers=1, chunk_size=1000, precision=DEFAULT_PRECISION):
+    """Evaluate every line of stream and write results to out in input order
+
+    With workers > 1 chunks are fanned out to a process pool. At most
+    2 * workers chunks are in flight, so memory use does not depend on the
+    input size. Returns (line count, elapsed seconds).
+    """
+    started = time.perf_counter()
+    count = 0
+
+    if workers <= 1:
+        for chunk in iter_chunks(stream, chunk_size):
+            results = evaluate_chunk(chunk, precision)
+            out.write("\n".join(results) + "\n")
+            count += len(results)
+        return count, time.perf_counter() - started
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in iter_chunks(stream, chunk_size):
+            pending.append(pool.submit(evaluate_chunk, chunk, precision))
+            if len(pending) >= 2 * workers:
+                results = pending.popleft().result()
+                out.write("\n".join(results) + "\n")
+                count += len(results)
+        while pending:
+            results = pending.popleft().result()
+            out.write("\n".join(results) + "\n")
+            count += len(results)
+    return count, time.perf_counter() - started
+
+
+def main(path="-", workers=1, chunk_size=1000, precision=DEFAULT_PRECISION):
+    """CLI entry point, throughput goes to stderr so stdout stays clean"""
+    if path == "-":
+        count, elapsed = run_batch(sys.stdin, sys.stdout, workers, chunk_size, precision)
+    else:
+        with open(path, "r", encoding="utf-8") as stream:
+            count, elapsed = run_batch(stream, sys.stdout, workers, chunk_size, precision)
+    sys.stdout.flush()
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"Processed {count} lines in {elapsed:.3f} s ({rate:,.0f} lines/s)", file=sys.stderr)
+    return 0
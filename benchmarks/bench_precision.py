@@ -0,0 +1,59 @@
+"""Per-operation cost of the engine at different precisions
+
+    python benchmarks/bench_precision.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import LRUCache
+from engine import CalculatorEngine
+
+PRECISIONS = (20, 100, 1000)
+KEYS = ('+', '-', '×', '÷', '%', 'xⁿ')
+
+
+def operand(digits, rng):
+    """Random operand with the given number of significant digits"""
+    text = str(rng.randrange(10 ** (digits - 1), 10 ** digits))
+    split = digits // 2
+    return f"{text[:split]}.{text[split:]}"
+
+
+def run_operation(engine, op, a, b):
+    """Evaluate one operation from a prepared state, including result formatting"""
+    engine.reset()
+    if op == '%':
+        engine.current_input = a
+        engine.percentage()
+    elif op == 'xⁿ':
+        engine.current_input = a
+        engine.power_function()
+        engine.power_count = "7"
+        engine.calculate_power()
+    else:
+        engine.previous_input, engine.operation, engine.current_input = a, op, b
+        engine.calculate()
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'op':<4}" + "".join(f"{p:>12}" for p in PRECISIONS) + "   (µs/op)")
+    rows = {op: [] for op in KEYS}
+    for precision in PRECISIONS:
+        # No result cache: every call does the arithmetic
+        engine = CalculatorEngine(precision=precision, cache=LRUCache(maxsize=0))
+        a, b = operand(precision, rng), operand(precision, rng)
+        for op in KEYS:
+            timer = timeit.Timer(lambda: run_operation(engine, op, a, b))
+            runs, total = timer.autorange()
+            rows[op].append(total / runs * 1e6)
+    for op, costs in rows.items():
+        print(f"{op:<4}" + "".join(f"{cost:12.1f}" for cost in costs))
+
+
+if __name__ == "__main__":
+    main()
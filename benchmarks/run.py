@@ -0,0 +1,220 @@
+"""Benchmark suite for the engine, formatting, startup and UI hot paths
+
+    python benchmarks/run.py run --output benchmarks/latest.json
+    python benchmarks/run.py compare baseline.json benchmarks/latest.json --threshold 10
+
+GUI benchmarks (cold start, retheme) need a display; on Linux without one
+they run under xvfb-run when it is installed and are skipped otherwise.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cache import LRUCache
+from engine import CalculatorEngine, format_result
+from units import UnitRegistry
+
+OPERATORS = ('+', '-', '×', '÷')
+OPERAND_DIGITS = (10, 100, 1000)
+EXPONENTS = (10, 1000, 10 ** 6, 10 ** 9)
+
+
+def measure(func, repeat=5):
+    """Per-call time in microseconds: min and median over repeat rounds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {"min_us": min(times), "median_us": statistics.median(times), "calls": number * repeat}
+
+
+def operand(digits, seed):
+    """Deterministic operand with the given number of digits, half of them decimals"""
+    text = "".join(str((seed * 7 + i * 3) % 9 + 1) for i in range(digits))
+    return f"{text[:digits // 2]}.{text[digits // 2:]}"
+
+
+def uncached_engine(precision):
+    """Engine that never hits the result cache, so every call does the math"""
+    return CalculatorEngine(precision=precision, cache=LRUCache(maxsize=0))
+
+
+def bench_calculate(results):
+    for digits in OPERAND_DIGITS:
+        engine = uncached_engine(max(digits + 10, 20))
+        a, b = operand(digits, 1), operand(digits, 2)
+        for op in OPERATORS:
+            def run(op=op):
+                engine.previous_input, engine.operation, engine.current_input = a, op, b
+                engine.calculate()
+            results[f"calculate[{op},{digits}d]"] = measure(run)
+
+
+def bench_power(results):
+    engine = uncached_engine(20)
+    for exponent in EXPONENTS:
+        def run(exponent=str(exponent)):
+            engine.power_mode, engine.power_base, engine.power_count = True, Decimal("1.0001"), exponent
+            engine.calculate_power()
+        results[f"calculate_power[1.0001^{exponent}]"] = measure(run)
+
+
+def bench_formatting(results):
+    values = {
+        "small": Decimal("0.1428571428571428571"),
+        "integer": Decimal("123456789012345"),
+        "huge": Decimal("9.9006562292958982507E+301029"),
+        "tiny": Decimal("1E-12")
+    }
+    for name, value in values.items():
+        results[f"format_result[{name}]"] = measure(lambda value=value: format_result(value))
+        results[f"format_result[{name}, width 16]"] = measure(
+            lambda value=value: format_result(value, width=16, grouping=True))
+
+
+def bench_input_number(results):
+    engine = uncached_engine(20)
+
+    def run():
+        engine.reset()
+        engine.power_mode, engine.power_base = True, Decimal(2)
+        for digit in "1234567":
+            engine.input_number(digit)
+    results["input_number[power mode, 7 digits]"] = measure(run)
+
+
+def bench_units(results):
+    registry = UnitRegistry.load()
+    column = [operand(10, seed) for seed in range(1000)]
+    for source, target in (("mi", "km"), ("degF", "degC")):
+        results[f"convert[{source}->{target}]"] = measure(
+            lambda source=source, target=target: registry.convert("98.6", source, target))
+    results["convert_many[mi->km, 1000 values]"] = measure(
+        lambda: registry.convert_many(column, "mi", "km"))
+
+
+def gui_command():
+    """Command prefix for GUI benchmarks, None when no display is available"""
+    if os.name == 'nt' or sys.platform == "darwin" or os.environ.get("DISPLAY"):
+        return [sys.executable]
+    if shutil.which("xvfb-run"):
+        return ["xvfb-run", "-a", sys.executable]
+    return None
+
+
+def bench_gui(results, rounds=5):
+    """Cold start and retheme time, each in fresh processes"""
+    command = gui_command()
+    if command is None:
+        print("⚠️ No display and no xvfb-run, skipping GUI benchmarks", file=sys.stderr)
+        return
+
+    totals = []
+    for _ in range(rounds):
+        output = subprocess.run(command + [os.path.join(ROOT, "calculator.py"), "--profile-startup"],
+                                capture_output=True, text=True, check=True).stdout
+        match = re.search(r"total\s+([\d.]+)", output)
+        if match:
+            totals.append(float(match.group(1)) * 1000)
+    if totals:
+        results["cold_start"] = {"min_us": min(totals), "median_us": statistics.median(totals),
+                                 "calls": len(totals)}
+
+    output = subprocess.run(command + [os.path.abspath(__file__), "retheme"],
+                            capture_output=True, text=True, check=True).stdout
+    results["apply_settings[retheme]"] = json.loads(output.strip().splitlines()[-1])
+
+
+def retheme_child(rounds=50):
+    """Runs inside the GUI process: time apply_settings across themes"""
+    import calculator
+
+    app = calculator.AdvancedCalculator()
+    app.window.update()
+    times = []
+    for i in range(rounds):
+        app.settings["theme"] = ("dark", "light", "blue")[i % 3]
+        app.apply_settings()
+        times.append(app.retheme_ms * 1000)
+    app.window.destroy()
+    print(json.dumps({"min_us": min(times), "median_us": statistics.median(times), "calls": rounds}))
+    return 0
+
+
+def run(output):
+    results = {}
+    for bench in (bench_calculate, bench_power, bench_formatting, bench_input_number, bench_units,
+                  bench_gui):
+        bench(results)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    for name, result in results.items():
+        print(f"{name:<40} {result['median_us']:12.2f} µs")
+    print(f"Saved to {output}")
+    return 0
+
+
+def compare(baseline_path, current_path, threshold):
+    """Flag benchmarks whose median got slower than threshold percent"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = json.load(f)["results"]
+
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        before, after = baseline[name]["median_us"], current[name]["median_us"]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ REGRESSION"
+            regressions += 1
+        print(f"{name:<40} {before:12.2f} → {after:12.2f} µs  {change:+7.1f}%{flag}")
+    for name in sorted(set(baseline) ^ set(current)):
+        print(f"{name:<40} only in {'baseline' if name in baseline else 'current'}")
+    print(f"{regressions} regression(s) above {threshold}%")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculator Plus benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the suite and save JSON results")
+    run_parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "latest.json"))
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="allowed slowdown in percent (default 10)")
+    commands.add_parser("retheme", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        return run(args.output)
+    if args.command == "compare":
+        return compare(args.baseline, args.current, args.threshold)
+    return retheme_child()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
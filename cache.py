@@ -0,0 +1,74 @@
+import sys
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Bounded mapping with least-recently-used eviction and hit/miss counters
+
+    With max_bytes set, entries are also evicted once the summed sizeof() of
+    the cached values exceeds the budget; a single value larger than the
+    budget is not cached at all.
+    """
+
+    def __init__(self, maxsize=256, max_bytes=None, sizeof=sys.getsizeof):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.data = OrderedDict()
+        self.sizes = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        """Return cached value and mark it as recently used"""
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store value, evicting the least recently used entries when full"""
+        if self.max_bytes is not None:
+            size = self.sizeof(value)
+            if size > self.max_bytes:
+                return
+            self.nbytes += size - self.sizes.get(key, 0)
+            self.sizes[key] = size
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize or (self.max_bytes is not None and self.nbytes > self.max_bytes):
+            old_key, _ = self.data.popitem(last=False)
+            if self.max_bytes is not None:
+                self.nbytes -= self.sizes.pop(old_key)
+            self.evictions += 1
+
+    def clear(self):
+        """Drop all entries, counters are kept"""
+        self.data.clear()
+        self.sizes.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """Counters for debug output"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self.nbytes,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -1,17 +1,113 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
-import json
+import time
+IMPORT_START = time.perf_counter()
+
+try:
+    import tkinter as tk
+    import tkinter.font as tkfont
+    from tkinter import ttk, messagebox
+    HAS_TK = True
+except ImportError:
+    # Headless modes (--serve, --batch, ...) work without Tk
+    HAS_TK = False
+import argparse
 import os
+import queue
 import sys
 import traceback
-from decimal import Decimal, getcontext
 
-# Import localization system
-try:
-    from lang import en, ru
-    HAS_LANGS = True
-except ImportError:
-    HAS_LANGS = False
+from engine import CalculatorEngine, DEFAULT_PRECISION, MAX_PRECISION, PRECISION_MODES, RESULT_CACHE, format_result
+from history import HistoryLog
+from localization import Localization, THEME_NAMES
+from settings_store import SettingsStore, config_path
+from updates import UpdateChecker
+from worker import JobRunner
+
+IMPORT_END = time.perf_counter()
+
+# Button grid: (literal text or btn_* text key, colour role, action id)
+# Action ids are the engine keys, so dispatch never depends on localized labels
+BUTTON_LAYOUT = [
+    [("btn_clear", "special", "C"), ("btn_backspace", "special", "⌫"),
+     ("btn_plus_minus", "special", "±"), ("btn_percent", "special", "%")],
+    [("7", "number", "7"), ("8", "number", "8"), ("9", "number", "9"), ("÷", "operation", "÷")],
+    [("4", "number", "4"), ("5", "number", "5"), ("6", "number", "6"), ("×", "operation", "×")],
+    [("1", "number", "1"), ("2", "number", "2"), ("3", "number", "3"), ("-", "operation", "-")],
+    [("btn_power", "operation", "xⁿ"), ("0", "number", "0"),
+     ("btn_decimal", "number", "."), ("+", "operation", "+")],
+    [None, None, None, ("btn_equals", "operation", "=")]
+]
+
+# Keyboard: keysyms and typed characters to action ids
+KEY_ACTIONS = {str(digit): str(digit) for digit in range(10)}
+KEY_ACTIONS.update({
+    '.': '.', ',': '.', 'KP_Decimal': '.',
+    '+': '+', '-': '-', '*': '×', '/': '÷', '^': 'xⁿ', '%': '%', '=': '=',
+    'Return': '=', 'KP_Enter': '=',
+    'BackSpace': '⌫', 'Escape': 'C'
+})
+
+# Widget options per colour role, mapped to theme keys
+THEME_ROLES = {
+    "number": {"bg": "numbers_bg", "fg": "numbers_fg"},
+    "operation": {"bg": "operations_bg", "fg": "operations_fg"},
+    "special": {"bg": "special_bg", "fg": "special_fg"},
+    "display": {"bg": "display_bg", "fg": "display_fg"},
+    "label": {"bg": "bg", "fg": "label_fg"},
+    "frame": {"bg": "bg"}
+}
+
+# Colour themes, shared by every calculator session in the process
+THEMES = {
+    "dark": {
+        "bg": "#2C2C2C",
+        "display_bg": "#1A1A1A", 
+        "display_fg": "white",
+        "label_fg": "#888888",
+        "numbers_bg": "#404040",
+        "numbers_fg": "white",
+        "operations_bg": "#FF9500",
+        "operations_fg": "white",
+        "special_bg": "#A6A6A6",
+        "special_fg": "black"
+    },
+    "light": {
+        "bg": "#F0F0F0",
+        "display_bg": "white",
+        "display_fg": "black",
+        "label_fg": "#666666",
+        "numbers_bg": "#E0E0E0",
+        "numbers_fg": "black",
+        "operations_bg": "#FF9500",
+        "operations_fg": "white",
+        "special_bg": "#C0C0C0",
+        "special_fg": "black"
+    },
+    "blue": {
+        "bg": "#1E3A5F",
+        "display_bg": "#0A1F3A",
+        "display_fg": "white",
+        "label_fg": "#88AAFF",
+        "numbers_bg": "#2A4A7F",
+        "numbers_fg": "white",
+        "operations_bg": "#FF6B35",
+        "operations_fg": "white",
+        "special_bg": "#4A76B4",
+        "special_fg": "white"
+    }
+}
+# Widget options per theme and role, built once at import
+THEME_OPTIONS = {name: {role: {option: theme[key] for option, key in colors.items()}
+                        for role, colors in THEME_ROLES.items()}
+                 for name, theme in THEMES.items()}
+
+# Grid rows: display, operation label, mode toolbar, then the keypad
+TOOLBAR_ROW = 2
+KEYPAD_ROW = 3
+
+HISTORY_PAGE = 100  # rows per page in the history tape
+# Display width in characters before the first <Configure>, and its lower bound
+DISPLAY_CHARS = 16
+MIN_DISPLAY_CHARS = 8
 
 def show_error_dialog(message):
     """Show error dialog with details"""
@@ -20,161 +116,110 @@ def show_error_dialog(message):
     messagebox.showerror("Calculator Error", message)
     root.destroy()
 
-try:
-    import requests
-    from packaging import version
-    HAS_DEPENDENCIES = True
-except ImportError as e:
-    print(f"❌ Missing dependencies: {e}")
-    HAS_DEPENDENCIES = False
-
 class AdvancedCalculator:
-    def __init__(self):
+    def __init__(self, master=None, localization=None, settings_store=None, history=None):
+        """Own Tk root by default; with master, a Toplevel session sharing the given resources"""
         try:
-            self.window = tk.Tk()
+            self.startup_times = {"import": IMPORT_END - IMPORT_START}
+            started = time.perf_counter()
+            self.shared = {"localization": localization, "settings_store": settings_store,
+                           "history": history}
+            self.window = tk.Tk() if master is None else tk.Toplevel(master)
             self.window.title("Calculator Plus v1.1.0")
-            self.window.geometry("450x600")
-            self.window.minsize(400, 550)
+            self.window.geometry("450x640")
+            self.window.minsize(400, 590)
             
             # Hide console window on Windows
-            if os.name == 'nt':
+            if os.name == 'nt' and master is None:
                 try:
                     import ctypes
                     ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
                 except:
                     pass
-            
-            # Check for updates only if dependencies are available
-            if HAS_DEPENDENCIES:
-                update_info = self.check_updates()
-                if update_info:
-                    messagebox.showinfo("Update Available", update_info)
+            self.startup_times["window_create"] = time.perf_counter() - started
             
             self.setup_calculator()
             
+            # Check for updates in the background, the window shows up immediately
+            # (standalone windows only, not sessions under a shared root)
+            if master is None:
+                self.update_results = queue.Queue()
+                UpdateChecker().check_async(self.update_results.put)
+                self.window.after(200, self.poll_updates)
+            
         except Exception as e:
             error_msg = f"Failed to initialize calculator:\n{str(e)}\n\nTraceback:\n{traceback.format_exc()}"
             print(error_msg)
             show_error_dialog(error_msg)
             sys.exit(1)
     
-    def check_updates(self):
-        """Check for updates from GitHub"""
+    def poll_updates(self):
+        """Show update notice once the background check has finished"""
         try:
-            GITHUB_URL = "https://api.github.com/repos/Irkindia/calculator-plus/releases/latest"
-            response = requests.get(GITHUB_URL, timeout=5)
-            if response.status_code == 200:
-                latest_release = response.json()
-                latest_version = latest_release['tag_name']
-                current_version = "v1.1.0"
-                
-                if version.parse(latest_version) > version.parse(current_version):
-                    return f"🎉 Update available {latest_version}!\n{latest_release['body']}\n\nDownload: https://github.com/Irkindia/calculator-plus"
-            return None
-        except:
-            return None
+            update_info = self.update_results.get_nowait()
+        except queue.Empty:
+            self.window.after(200, self.poll_updates)
+            return
+        if update_info:
+            messagebox.showinfo("Update Available", update_info)
     
     def setup_calculator(self):
         """Setup calculator components"""
         # Default settings
         self.settings = {
             "language": "russian", 
-            "theme": "dark"
+            "theme": "dark",
+            "precision": DEFAULT_PRECISION,
+            "grouping": False
         }
         
         # Load settings from file
+        started = time.perf_counter()
         self.load_settings()
         
         # Setup localization
         self.setup_localization()
+        self.startup_times["settings_load"] = time.perf_counter() - started
         
-        # Themes configuration
-        self.themes = {
-            "dark": {
-                "bg": "#2C2C2C",
-                "display_bg": "#1A1A1A", 
-                "display_fg": "white",
-                "label_fg": "#888888",
-                "numbers_bg": "#404040",
-                "numbers_fg": "white",
-                "operations_bg": "#FF9500",
-                "operations_fg": "white",
-                "special_bg": "#A6A6A6",
-                "special_fg": "black"
-            },
-            "light": {
-                "bg": "#F0F0F0",
-                "display_bg": "white",
-                "display_fg": "black",
-                "label_fg": "#666666",
-                "numbers_bg": "#E0E0E0",
-                "numbers_fg": "black",
-                "operations_bg": "#FF9500",
-                "operations_fg": "white",
-                "special_bg": "#C0C0C0",
-                "special_fg": "black"
-            },
-            "blue": {
-                "bg": "#1E3A5F",
-                "display_bg": "#0A1F3A",
-                "display_fg": "white",
-                "label_fg": "#88AAFF",
-                "numbers_bg": "#2A4A7F",
-                "numbers_fg": "white",
-                "operations_bg": "#FF6B35",
-                "operations_fg": "white",
-                "special_bg": "#4A76B4",
-                "special_fg": "white"
-            }
-        }
+        self.current_theme = THEMES[self.settings["theme"]]
         
-        self.current_theme = self.themes[self.settings["theme"]]
+        # Calculator state lives in the headless engine
+        self.engine = CalculatorEngine(power_prompt=self.get_text("power_prompt"),
+                                       precision=self.settings["precision"])
         
-        # Calculator state variables
-        self.current_input = ""
-        self.previous_input = ""
-        self.operation = None
-        self.power_mode = False
-        self.power_base = None
-        self.power_count = ""
-        self.new_input = True
+        # Heavy results are computed in a worker process, see worker.py
+        self.engine.worker = JobRunner(self.window, on_done=self.schedule_refresh)
+        
+        # Calculation history, appends are written off the UI thread
+        self.history = self.shared["history"]
+        if self.history is None:
+            try:
+                self.history = HistoryLog()
+            except (OSError, ValueError) as e:
+                print(f"❌ History disabled: {e}")
+        if self.history is not None:
+            self.engine.on_result = self.history.append
         
+        started = time.perf_counter()
+        self.retheme_ms = None
+        self.refresh_pending = False
+        self.recorder = None
+        self.worksheet = None
+        self.stats_scan = None  # cancel event of a running statistics scan
+        self.converter = None  # widgets of the unit conversion panel while it is shown
         self.setup_ui()
+        self.bind_keys()
+        self.startup_times["widget_build"] = time.perf_counter() - started
     
     def setup_localization(self):
-        """Setup localization system"""
-        if not HAS_LANGS:
-            # Minimal fallback translations
-            self.languages = {
-                "english": {
-                    "title": "Calculator Plus",
-                    "power_prompt": "ⁿ (enter power)",
-                    "settings_title": "Settings",
-                    "language_label": "Language:",
-                    "theme_label": "Theme:",
-                    "save_btn": "Save",
-                    "error_division": "Division by zero!",
-                    "error_input": "Invalid input!"
-                },
-                "russian": {
-                    "title": "Калькулятор Плюс",
-                    "power_prompt": "ⁿ (введите степень)",
-                    "settings_title": "Настройки",
-                    "language_label": "Язык:",
-                    "theme_label": "Тема:",
-                    "save_btn": "Сохранить",
-                    "error_division": "Деление на ноль!",
-                    "error_input": "Некорректный ввод!"
-                }
-            }
-        else:
-            # Use external language files
-            self.languages = {
-                "english": en.translations,
-                "russian": ru.translations
-            }
-        
-        self.current_lang = self.languages[self.settings["language"]]
+        """Discover languages under lang/ and load the active one"""
+        self.localization = self.shared["localization"] or Localization()
+        self.load_language(self.settings["language"])
+    
+    def load_language(self, name):
+        """Switch catalogs, forward and reverse indexes are built once per language"""
+        self.catalog = self.localization.load(name)
+        self.current_lang = self.catalog.texts
     
     def get_text(self, key):
         """Get localized text by key"""
@@ -182,150 +227,141 @@ class AdvancedCalculator:
     
     def get_localized_themes(self):
         """Get theme names in current language"""
-        if HAS_LANGS:
-            return [
-                self.get_text("theme_dark"),
-                self.get_text("theme_light"), 
-                self.get_text("theme_blue")
-            ]
-        else:
-            return ["Dark", "Light", "Blue"]
+        return self.catalog.theme_names
     
     def get_localized_languages(self):
         """Get language names - each in its native form"""
-        return ["Русский", "English"]
+        return self.localization.names()
     
     def get_theme_key(self, localized_name):
         """Convert localized theme name back to key"""
-        if HAS_LANGS:
-            themes_map = {
-                self.get_text("theme_dark"): "dark",
-                self.get_text("theme_light"): "light", 
-                self.get_text("theme_blue"): "blue"
-            }
-        else:
-            themes_map = {"Dark": "dark", "Light": "light", "Blue": "blue"}
-        return themes_map.get(localized_name, "dark")
+        return self.catalog.theme_keys.get(localized_name, "dark")
     
     def get_language_key(self, localized_name):
         """Convert native language name back to key"""
-        langs_map = {
-            "Русский": "russian",
-            "English": "english"
-        }
-        return langs_map.get(localized_name, "russian")
+        return self.localization.language_key(localized_name, self.settings["language"])
     
     def get_current_language_display(self):
         """Get current language in its native form"""
-        if self.settings["language"] == "russian":
-            return "Русский"
-        else:
-            return "English"
+        return self.localization.native_name(self.settings["language"])
         
     def load_settings(self):
-        """Load settings from JSON file"""
-        try:
-            if os.path.exists("calculator_settings.json"):
-                with open("calculator_settings.json", "r", encoding="utf-8") as f:
-                    loaded_settings = json.load(f)
-                    self.settings.update(loaded_settings)
-        except:
-            pass
+        """Load settings from the per-user JSON file"""
+        self.settings_store = self.shared["settings_store"] or SettingsStore()
+        self.settings = self.settings_store.load(self.settings)
+        if self.settings.get("precision") not in PRECISION_MODES:
+            self.settings["precision"] = DEFAULT_PRECISION
     
     def save_settings(self):
-        """Save settings to JSON file"""
-        try:
-            with open("calculator_settings.json", "w", encoding="utf-8") as f:
-                json.dump(self.settings, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+        """Save settings to JSON file (atomic, debounced, on a background thread)"""
+        self.settings_store.save(self.settings)
     
     def setup_ui(self):
         """Initialize user interface"""
-        self.window.configure(bg=self.current_theme["bg"])
-        self.window.title(self.get_text("title"))
+        # Created widgets by role, so theme and language changes only reconfigure them
+        self.themed = []     # (widget, role)
+        self.localized = []  # (widget, text key)
         
         self.create_display()
+        self.create_toolbar()
         self.create_buttons()
         self.create_settings_button()
+        self.apply_theme()
+        self.apply_language()
         
     def create_display(self):
         """Create calculator display area"""
         # Main display entry
         self.display = tk.Entry(self.window, font=('Arial', 24), 
-                               justify='right', bd=10, relief='flat',
-                               bg=self.current_theme["display_bg"], 
-                               fg=self.current_theme["display_fg"])
+                               justify='right', bd=10, relief='flat')
         self.display.grid(row=0, column=0, columnspan=4, sticky='we', padx=10, pady=10)
+        self.themed.append((self.display, "display"))
+        # Typed or pasted expressions are evaluated on Enter
+        self.display.bind('<Return>', self.evaluate_display)
+        self.display.bind('<KP_Enter>', self.evaluate_display)
+        # Results are fitted to the visible width in characters
+        self.char_width = max(tkfont.Font(font=self.display.cget("font")).measure("0"), 1)
+        self.display_chars = DISPLAY_CHARS
+        self.shown_text = ""
+        self.display.bind('<Configure>', self.on_display_resize)
         
         # Operation display label
-        self.operation_label = tk.Label(self.window, font=('Arial', 12), 
-                                       bg=self.current_theme["bg"], 
-                                       fg=self.current_theme["label_fg"])
+        self.operation_label = tk.Label(self.window, font=('Arial', 12))
         self.operation_label.grid(row=1, column=0, columnspan=4, sticky='w', padx=15)
+        self.themed.append((self.operation_label, "label"))
         
     def create_settings_button(self):
         """Create settings button in top-left corner"""
         settings_btn = tk.Button(self.window, text="⚙", font=('Arial', 14),
-                                bg=self.current_theme["special_bg"],
-                                fg=self.current_theme["special_fg"],
                                 width=3, height=1,
                                 command=self.open_settings)
         settings_btn.grid(row=0, column=0, sticky='nw', padx=5, pady=5)
+        self.themed.append((settings_btn, "special"))
+    
+    def create_toolbar(self):
+        """Mode buttons in their own row between the display and the keypad"""
+        toolbar = tk.Frame(self.window)
+        toolbar.grid(row=TOOLBAR_ROW, column=0, columnspan=4, sticky='e', padx=5)
+        self.themed.append((toolbar, "frame"))
+        # Right to left: history tape, worksheet, unit conversion
+        for text, command in (("☰", self.open_history), ("Σ", self.open_worksheet),
+                              ("⇄", self.toggle_converter)):
+            btn = tk.Button(toolbar, text=text, font=('Arial', 14), width=3, height=1,
+                           command=command)
+            btn.pack(side='right', padx=3, pady=3)
+            self.themed.append((btn, "special"))
     
     def create_buttons(self):
         """Create calculator buttons grid"""
-        buttons = [
-            [self.get_text("btn_clear"), self.get_text("btn_backspace"), self.get_text("btn_plus_minus"), self.get_text("btn_percent")],
-            ['7', '8', '9', '÷'],  # Changed / to ÷
-            ['4', '5', '6', '×'],  # Changed * to ×
-            ['1', '2', '3', '-'],
-            [self.get_text("btn_power"), '0', self.get_text("btn_decimal"), '+'],
-            ['', '', '', self.get_text("btn_equals")]
-        ]
-        
-        for row, row_buttons in enumerate(buttons):
-            for col, text in enumerate(row_buttons):
-                if text:  # Skip empty buttons
-                    btn = self.create_button(text, row, col)
+        for row, row_buttons in enumerate(BUTTON_LAYOUT):
+            for col, spec in enumerate(row_buttons):
+                if spec:  # Skip empty buttons
+                    self.create_button(*spec, row, col)
         
         # Create large equal button
-        equal_btn = tk.Button(self.window, text=self.get_text("btn_equals"), font=('Arial', 18),
-                             bg=self.current_theme["operations_bg"],
-                             fg=self.current_theme["operations_fg"], bd=0, relief='flat',
+        equal_btn = tk.Button(self.window, font=('Arial', 18), bd=0, relief='flat',
                              command=lambda: self.button_click('='))
-        equal_btn.grid(row=7, column=0, columnspan=4, sticky='news', padx=2, pady=2)
+        equal_btn.grid(row=KEYPAD_ROW + len(BUTTON_LAYOUT) - 1, column=0, columnspan=4,
+                      sticky='news', padx=2, pady=2)
+        self.themed.append((equal_btn, "operation"))
+        self.localized.append((equal_btn, "btn_equals"))
         
         # Configure grid responsiveness
         for i in range(4):
             self.window.grid_columnconfigure(i, weight=1)
-        for i in range(2, 8):
+        for i in range(KEYPAD_ROW, KEYPAD_ROW + len(BUTTON_LAYOUT)):
             self.window.grid_rowconfigure(i, weight=1)
     
-    def create_button(self, text, row, col):
-        """Create individual calculator button"""
-        # Determine button color scheme
-        if text in ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9', '.']:
-            bg = self.current_theme["numbers_bg"]
-            fg = self.current_theme["numbers_fg"]
-        elif text in ['÷', '×', '-', '+', '=', 'xⁿ']:  # Added ÷ and ×
-            bg = self.current_theme["operations_bg"]
-            fg = self.current_theme["operations_fg"]
+    def create_button(self, label, role, action, row, col):
+        """Create individual calculator button, label is literal text or a btn_* text key"""
+        btn = tk.Button(self.window, font=('Arial', 18), bd=0, relief='flat',
+                       command=lambda: self.button_click(action))
+        btn.grid(row=row + KEYPAD_ROW, column=col, sticky='news', padx=2, pady=2)
+        self.themed.append((btn, role))
+        if label.startswith("btn_"):
+            self.localized.append((btn, label))
         else:
-            bg = self.current_theme["special_bg"]
-            fg = self.current_theme["special_fg"]
-        
-        btn = tk.Button(self.window, text=text, font=('Arial', 18),
-                       bg=bg, fg=fg, bd=0, relief='flat',
-                       command=lambda t=text: self.button_click(t))
-        btn.grid(row=row+2, column=col, sticky='news', padx=2, pady=2)
+            btn.configure(text=label)
         return btn
     
+    def apply_theme(self):
+        """Recolour existing widgets from the current theme"""
+        options = THEME_OPTIONS[self.settings["theme"]]
+        self.window.configure(bg=self.current_theme["bg"])
+        for widget, role in self.themed:
+            widget.configure(**options[role])
+    
+    def apply_language(self):
+        """Relabel existing widgets from the current language"""
+        self.window.title(self.get_text("title"))
+        for widget, key in self.localized:
+            widget.configure(text=self.get_text(key))
+    
     def open_settings(self):
         """Settings window"""
         settings_window = tk.Toplevel(self.window)
         settings_window.title(self.get_text("settings_title"))
-        settings_window.geometry("300x220")  # Increased height for version
+        settings_window.geometry("300x290")  # Increased height for version and precision
         settings_window.configure(bg=self.current_theme["bg"])
         settings_window.resizable(False, False)
         
@@ -344,15 +380,30 @@ class AdvancedCalculator:
         # Theme
         tk.Label(settings_window, text=self.get_text("theme_label"),
                 bg=self.current_theme["bg"], fg=self.current_theme["display_fg"]).pack(pady=5)
-        theme_var = tk.StringVar(value=self.get_localized_themes()[["dark", "light", "blue"].index(self.settings["theme"])])
+        theme_var = tk.StringVar(value=self.get_localized_themes()[THEME_NAMES.index(self.settings["theme"])])
         theme_combo = ttk.Combobox(settings_window, textvariable=theme_var,
                                   values=self.get_localized_themes(), state="readonly")
         theme_combo.pack(pady=5)
         
+        # Precision (significant digits)
+        tk.Label(settings_window, text=self.get_text("precision_label"),
+                bg=self.current_theme["bg"], fg=self.current_theme["display_fg"]).pack(pady=5)
+        precision_var = tk.StringVar(value=str(self.settings["precision"]))
+        precision_combo = ttk.Combobox(settings_window, textvariable=precision_var,
+                                      values=[str(p) for p in PRECISION_MODES], state="readonly")
+        precision_combo.pack(pady=5)
+        
+        grouping_var = tk.BooleanVar(value=self.settings["grouping"])
+        tk.Checkbutton(settings_window, text=self.get_text("grouping_label"), variable=grouping_var,
+                       bg=self.current_theme["bg"], fg=self.current_theme["display_fg"],
+                       selectcolor=self.current_theme["bg"]).pack(pady=5)
+        
         def save_and_close():
             self.settings.update({
                 "language": self.get_language_key(lang_var.get()),
-                "theme": self.get_theme_key(theme_var.get())
+                "theme": self.get_theme_key(theme_var.get()),
+                "precision": int(precision_var.get()),
+                "grouping": grouping_var.get()
             })
             self.save_settings()
             settings_window.destroy()
@@ -368,246 +419,729 @@ class AdvancedCalculator:
                                 font=('Arial', 8))
         version_label.pack(side='right', padx=5, pady=5)
     
-    def apply_settings(self):
-        """Apply new settings"""
-        self.current_lang = self.languages[self.settings["language"]]
-        self.current_theme = self.themes[self.settings["theme"]]
+    def open_history(self):
+        """History tape: newest page from memory, older pages and search from the log"""
+        if self.history is None:
+            return
+        history = self.history
+        history_window = tk.Toplevel(self.window)
+        history_window.title(self.get_text("history_title"))
+        history_window.geometry("380x440")
+        history_window.configure(bg=self.current_theme["bg"])
+        history_window.transient(self.window)
         
-        # Update entire interface
-        for widget in self.window.winfo_children():
-            widget.destroy()
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(history_window, textvariable=search_var, font=('Arial', 12),
+                               bg=self.current_theme["display_bg"], fg=self.current_theme["display_fg"])
+        search_entry.pack(fill='x', padx=5, pady=5)
         
-        self.setup_ui()
+        listbox = tk.Listbox(history_window, font=('Arial', 11), activestyle='none',
+                            bg=self.current_theme["display_bg"], fg=self.current_theme["display_fg"])
+        listbox.pack(fill='both', expand=True, padx=5)
+        
+        nav = tk.Frame(history_window, bg=self.current_theme["bg"])
+        nav.pack(fill='x', pady=5)
+        shown = []  # records behind the listbox rows
+        position = {"back": 0}  # records skipped from the newest end
+        
+        def show(records):
+            shown[:] = records
+            listbox.delete(0, tk.END)
+            for record in records:
+                listbox.insert(tk.END, str(record))
+        
+        def show_page():
+            back = position["back"]
+            if back == 0:
+                records = list(history.tape)[-HISTORY_PAGE:]
+            else:
+                stop = max(len(history) - back, 0)
+                records = history.records(stop - HISTORY_PAGE, stop)
+            show(records[::-1])
+        
+        def move(pages):
+            position["back"] = min(max(position["back"] + pages * HISTORY_PAGE, 0),
+                                   max(len(history) - 1, 0))
+            show_page()
+        
+        def search(event=None):
+            text = search_var.get().strip()
+            if text:
+                show([record for index, record in history.search(text, HISTORY_PAGE)])
+            else:
+                show_page()
+        
+        def use_result(event=None):
+            selection = listbox.curselection()
+            if selection:
+                self.paste(shown[selection[0]].result)
+        
+        for text, pages in (("◀", 1), ("▶", -1)):
+            tk.Button(nav, text=text, width=4, command=lambda p=pages: move(p),
+                     bg=self.current_theme["special_bg"],
+                     fg=self.current_theme["special_fg"]).pack(side='left', padx=5)
+        search_entry.bind('<Return>', search)
+        listbox.bind('<Double-Button-1>', use_result)
+        show_page()
     
-    def button_click(self, text):
-        """Handle button clicks"""
-        if text in '0123456789':
-            self.input_number(text)
-        elif text in ['÷', '×', '-', '+']:  # Added ÷ and ×
-            self.input_operation(text)
-        elif text == '=':
-            self.calculate()
-        elif text == self.get_text("btn_clear"):
-            self.clear()
-        elif text == self.get_text("btn_backspace"):
-            self.backspace()
-        elif text == self.get_text("btn_plus_minus"):
-            self.plus_minus()
-        elif text == self.get_text("btn_percent"):
-            self.percentage()
-        elif text == self.get_text("btn_power"):
-            self.power_function()
-        elif text == self.get_text("btn_decimal"):
-            self.input_decimal()
-    
-    def backspace(self):
-        """Delete last character"""
-        if self.current_input:
-            self.current_input = self.current_input[:-1]
-            self.update_display()
+    def open_worksheet(self):
+        """Worksheet: expression lines that reuse earlier results as #n, recalculated on edit"""
+        if self.worksheet is None:
+            from worksheet import Worksheet, open_store
+            self.worksheet = Worksheet(self.engine.precision)
+            self.worksheet_store = open_store()
+            data = self.worksheet_store.read(self.worksheet_store.path)
+            if data is not None:
+                self.worksheet.load_dict(data)
+        sheet = self.worksheet
+        sheet_window = tk.Toplevel(self.window)
+        sheet_window.title(self.get_text("worksheet_title"))
+        sheet_window.geometry("420x480")
+        sheet_window.configure(bg=self.current_theme["bg"])
+        sheet_window.transient(self.window)
+        
+        listbox = tk.Listbox(sheet_window, font=('Arial', 11), activestyle='none',
+                            bg=self.current_theme["display_bg"], fg=self.current_theme["display_fg"])
+        listbox.pack(fill='both', expand=True, padx=5, pady=5)
+        for number in range(1, len(sheet) + 1):
+            listbox.insert(tk.END, sheet.row(number))
+        
+        line_var = tk.StringVar()
+        line_entry = tk.Entry(sheet_window, textvariable=line_var, font=('Arial', 12),
+                             bg=self.current_theme["display_bg"], fg=self.current_theme["display_fg"])
+        line_entry.pack(fill='x', padx=5, pady=5)
+        line_entry.focus_set()
+        editing = {"line": None}  # None appends a new line
+        
+        def select(event=None):
+            selection = listbox.curselection()
+            if selection:
+                editing["line"] = selection[0] + 1
+                line_var.set(sheet.texts[selection[0]])
+        
+        def commit(event=None):
+            number = editing["line"] or len(sheet) + 1
+            appended = number > len(sheet)
+            changed = sheet.set_line(number, line_var.get())
+            if appended:
+                listbox.insert(tk.END, sheet.row(number))
+            # Only recomputed rows are redrawn
+            for line in changed:
+                if not (appended and line == number):
+                    listbox.delete(line - 1)
+                    listbox.insert(line - 1, sheet.row(line))
+            listbox.see(number - 1)
+            editing["line"] = None
+            line_var.set("")
+            listbox.selection_clear(0, tk.END)
+            self.worksheet_store.save(sheet.to_dict())
+            return "break"
+        
+        def use_result(event=None):
+            selection = listbox.curselection()
+            if selection and sheet.results[selection[0]] is not None:
+                self.paste(sheet.results[selection[0]])
+        
+        listbox.bind('<<ListboxSelect>>', select)
+        listbox.bind('<Double-Button-1>', use_result)
+        line_entry.bind('<Return>', commit)
+        line_entry.bind('<KP_Enter>', commit)
+        line_entry.bind('<Escape>', lambda event: (editing.update(line=None), line_var.set("")))
     
-    def input_number(self, num):
-        """Input number"""
-        if self.power_mode:
-            if self.power_base is not None:
-                self.power_count += num
-                self.operation_label.config(text=f"{self.power_base}ⁿ = {self.power_base}" + 
-                                           f" × {self.power_base}" * (int(self.power_count or 0) - 1))
-            return
-            
-        # If it's new input (after operation), clear field
-        if self.new_input:
-            self.current_input = ""
-            self.new_input = False
-            
-        if self.current_input == "0":
-            self.current_input = num
+    def apply_settings(self):
+        """Apply new settings, retheme_ms keeps the last retheme latency"""
+        self.load_language(self.settings["language"])
+        self.current_theme = THEMES[self.settings["theme"]]
+        self.engine.power_prompt = self.get_text("power_prompt")
+        if self.engine.precision != self.settings["precision"]:
+            self.engine.set_precision(self.settings["precision"])
+            if self.worksheet is not None:
+                self.worksheet.set_precision(self.settings["precision"])
+        
+        # Reconfigure widgets in place, calculator state is untouched
+        started = time.perf_counter()
+        self.apply_theme()
+        self.apply_language()
+        self.refresh()
+        self.window.update_idletasks()
+        self.retheme_ms = (time.perf_counter() - started) * 1000
+    
+    def button_click(self, action, source="button"):
+        """Handle button clicks and keys by action id"""
+        if action == 'C' and self.stats_scan is not None:
+            self.stats_scan.set()
+        if self.recorder is not None:
+            self.recorder.record(source, action)
+        self.engine.press(action)
+        self.schedule_refresh()
+    
+    def bind_keys(self):
+        """Keyboard input on the main window"""
+        self.window.bind('<Key>', self.on_key)
+        self.window.bind('<<Paste>>', self.on_paste)
+        self.window.bind('<F12>', self.show_debug)
+        self.window.bind('<F9>', self.toggle_recording)
+        self.window.bind('<F8>', self.open_stats)
+        self.window.bind('<F7>', self.open_plot)
+        self.window.bind('<F6>', self.toggle_converter)
+    
+    def on_key(self, event):
+        """Map a key press to an action id"""
+        action = KEY_ACTIONS.get(event.keysym) or KEY_ACTIONS.get(event.char)
+        if action is None:
+            return None
+        if event.widget is self.display:
+            # Typing into the display edits an expression, Escape leaves it
+            if action != 'C':
+                return None
+            self.window.focus_set()
+        self.button_click(action, "key")
+        return "break"
+    
+    def paste(self, text):
+        """Paste into the engine, recorded so macros replay panel results too"""
+        if self.recorder is not None:
+            self.recorder.record("paste", text)
+        self.engine.paste(text)
+        self.schedule_refresh()
+    
+    def on_paste(self, event):
+        """Paste a number or expression in one step"""
+        if event.widget is self.display:
+            return None
+        try:
+            text = self.window.clipboard_get()
+        except tk.TclError:
+            return "break"
+        self.paste(text)
+        return "break"
+    
+    def toggle_converter(self, event=None):
+        """F6: unit conversion panel right of the button grid, converts the displayed value"""
+        if self.converter is not None:
+            panel = self.converter["panel"]
+            self.themed = [(widget, role) for widget, role in self.themed
+                           if widget.master is not panel and widget is not panel]
+            self.localized = [(widget, key) for widget, key in self.localized if widget.master is not panel]
+            panel.destroy()
+            self.converter = None
+            self.window.geometry(f"{max(self.window.winfo_width() - 220, 400)}x{self.window.winfo_height()}")
+            return "break"
+        import units
+        try:
+            registry = units.registry()
+        except (OSError, ValueError) as e:
+            self.show_error(f"Could not load units: {e}")
+            return "break"
+        dimensions = list(registry.dimensions)
+        names = [self.current_lang.get(f"unit_{dimension}", dimension.title()) for dimension in dimensions]
+        
+        panel = tk.Frame(self.window)
+        panel.grid(row=0, column=4, rowspan=KEYPAD_ROW + len(BUTTON_LAYOUT), sticky='news', padx=5, pady=10)
+        self.themed.append((panel, "frame"))
+        title = tk.Label(panel, font=('Arial', 12))
+        title.pack(anchor='w', pady=(30, 5))
+        self.themed.append((title, "label"))
+        self.localized.append((title, "convert_title"))
+        dimension_var = tk.StringVar(value=names[0])
+        source_var = tk.StringVar()
+        target_var = tk.StringVar()
+        dimension_box = ttk.Combobox(panel, textvariable=dimension_var, values=names,
+                                     state="readonly", width=14)
+        dimension_box.pack(fill='x', pady=5)
+        source_box = ttk.Combobox(panel, textvariable=source_var, state="readonly", width=14)
+        source_box.pack(fill='x', pady=5)
+        swap_btn = tk.Button(panel, text="⇅", font=('Arial', 12), bd=0, relief='flat')
+        swap_btn.pack(pady=2)
+        self.themed.append((swap_btn, "special"))
+        target_box = ttk.Combobox(panel, textvariable=target_var, state="readonly", width=14)
+        target_box.pack(fill='x', pady=5)
+        result = tk.Label(panel, font=('Arial', 14), anchor='e', wraplength=200)
+        result.pack(fill='x', pady=10)
+        self.themed.append((result, "display"))
+        use_btn = tk.Button(panel, text="=", font=('Arial', 14), bd=0, relief='flat')
+        use_btn.pack(fill='x')
+        self.themed.append((use_btn, "operation"))
+        
+        def pick_dimension(event=None):
+            unit_names = registry.dimensions[dimensions[names.index(dimension_var.get())]]
+            source_box.configure(values=unit_names)
+            target_box.configure(values=unit_names)
+            source_var.set(unit_names[0])
+            target_var.set(unit_names[min(1, len(unit_names) - 1)])
+            self.update_conversion()
+        
+        def swap():
+            source, target = source_var.get(), target_var.get()
+            source_var.set(target)
+            target_var.set(source)
+            self.update_conversion()
+        
+        def use_result():
+            text = self.converter["value"]
+            if text is not None:
+                self.paste(text)
+        
+        dimension_box.bind('<<ComboboxSelected>>', pick_dimension)
+        for box in (source_box, target_box):
+            box.bind('<<ComboboxSelected>>', lambda event: self.update_conversion())
+        swap_btn.configure(command=swap)
+        use_btn.configure(command=use_result)
+        self.converter = {"panel": panel, "registry": registry, "source": source_var,
+                          "target": target_var, "result": result, "value": None}
+        self.apply_theme()
+        self.apply_language()
+        self.window.geometry(f"{self.window.winfo_width() + 220}x{self.window.winfo_height()}")
+        pick_dimension()
+        return "break"
+    
+    def update_conversion(self):
+        """Convert the displayed value at the engine's precision"""
+        converter = self.converter
+        value = converter["value"] = None
+        try:
+            value = converter["registry"].convert(self.engine.display, converter["source"].get(),
+                                                  converter["target"].get(), self.engine.precision)
+        except (ValueError, ArithmeticError):
+            pass
+        if value is not None and value.is_finite():
+            converter["value"] = format_result(value, self.engine.places)
+            text = f"{converter['value']} {converter['target'].get()}"
         else:
-            self.current_input += num
-        self.update_display()
+            text = "—"
+        converter["result"].configure(text=text)
     
-    def power_function(self):
-        """Activate power mode"""
-        if self.current_input:
-            self.power_mode = True
-            self.power_base = float(self.current_input)
-            self.power_count = ""
-            self.operation_label.config(text=f"{self.current_input}{self.get_text('power_prompt')}")
-            self.current_input = ""
-            self.new_input = True
-            self.update_display()
-        elif self.power_mode and self.power_count:
-            self.calculate_power()
+    def open_plot(self, event=None):
+        """F7: plot and tabulate f(x); drag to pan, wheel to zoom"""
+        import plot
+        try:
+            plot.require_numpy("Plot mode")
+        except RuntimeError as e:
+            self.show_error(str(e))
+            return "break"
+        theme = self.current_theme
+        plot_window = tk.Toplevel(self.window)
+        plot_window.title(self.get_text("plot_title"))
+        plot_window.geometry("640x560")
+        plot_window.configure(bg=theme["bg"])
+        
+        controls = tk.Frame(plot_window, bg=theme["bg"])
+        controls.pack(fill='x', padx=5, pady=5)
+        function_var = tk.StringVar(value="x^2")
+        low_var = tk.StringVar(value="-10")
+        high_var = tk.StringVar(value="10")
+        samples_var = tk.StringVar(value=str(plot.SAMPLE_COUNTS[3]))
+        for label, var, width in (("f(x) =", function_var, 18), ("x ∈", low_var, 7), ("…", high_var, 7)):
+            tk.Label(controls, text=label, bg=theme["bg"], fg=theme["label_fg"]).pack(side='left')
+            tk.Entry(controls, textvariable=var, width=width,
+                    bg=theme["display_bg"], fg=theme["display_fg"]).pack(side='left', padx=2)
+        ttk.Combobox(controls, textvariable=samples_var, width=10, state="readonly",
+                     values=[str(n) for n in plot.SAMPLE_COUNTS]).pack(side='left', padx=2)
+        
+        canvas = tk.Canvas(plot_window, bg=theme["display_bg"], highlightthickness=0)
+        canvas.pack(fill='both', expand=True, padx=5)
+        status = tk.Label(plot_window, anchor='w', bg=theme["bg"], fg=theme["label_fg"], font=('Arial', 9))
+        status.pack(fill='x', padx=5)
+        rows = tk.Listbox(plot_window, height=6, font=('Arial', 10), activestyle='none',
+                         bg=theme["display_bg"], fg=theme["display_fg"])
+        rows.pack(fill='x', padx=5, pady=5)
+        state = {"sampler": None, "text": None, "view": None, "pending": False, "drag": None}
+        
+        def view():
+            if state["view"] is None:
+                low, high = float(low_var.get()), float(high_var.get())
+                if not high > low:
+                    raise ValueError("empty range")
+                state["view"] = (low, high)
+            return state["view"]
+        
+        def redraw():
+            state["pending"] = False
+            text = function_var.get()
+            try:
+                if state["text"] != text:
+                    state["sampler"], state["text"] = plot.Sampler(text), text
+                x0, x1 = view()
+                width, height = max(canvas.winfo_width(), 50), max(canvas.winfo_height(), 50)
+                result = plot.render(state["sampler"], x0, x1, int(samples_var.get()), width, height)
+            except (ValueError, ArithmeticError):
+                state["text"] = None
+                status.config(text=self.get_text("error_input"))
+                return
+            started = time.perf_counter()
+            canvas.delete("all")
+            y0, y1 = result["y_range"]
+            if x0 < 0 < x1:
+                column = (0 - x0) / (x1 - x0) * width
+                canvas.create_line(column, 0, column, height, fill=theme["label_fg"])
+            if y0 < 0 < y1:
+                row = y1 / (y1 - y0) * (height - 1)
+                canvas.create_line(0, row, width, row, fill=theme["label_fg"])
+            for points in result["lines"]:
+                canvas.create_line(*points, fill=theme["operations_bg"])
+            draw_ms = (time.perf_counter() - started) * 1000
+            status.config(text=f"x {x0:.6g} … {x1:.6g}   y {y0:.6g} … {y1:.6g}   "
+                               f"{result['samples']:,} samples ({result['evaluated']:,} new): "
+                               f"sample {result['sample_ms']:.1f} ms, decimate {result['decimate_ms']:.1f} ms, "
+                               f"draw {draw_ms:.1f} ms")
+        
+        def schedule(event=None):
+            if not state["pending"]:
+                state["pending"] = True
+                plot_window.after_idle(redraw)
+        
+        def replot(event=None):
+            state["view"] = None
+            schedule()
+            tabulate()
+        
+        def tabulate():
+            rows.delete(0, tk.END)
+            try:
+                pairs = plot.table(function_var.get(), low_var.get(), high_var.get(),
+                                   precision=self.engine.precision)
+            except (ValueError, ArithmeticError):
+                return
+            for x, y in pairs:
+                rows.insert(tk.END, f"{x:>16}   {y}")
+        
+        def start_drag(event):
+            state["drag"] = event.x
+        
+        def drag(event):
+            if state["drag"] is None or state["view"] is None:
+                return
+            x0, x1 = state["view"]
+            shift = (state["drag"] - event.x) / max(canvas.winfo_width(), 1) * (x1 - x0)
+            state["view"], state["drag"] = (x0 + shift, x1 + shift), event.x
+            schedule()
+        
+        def zoom(event):
+            if state["view"] is None:
+                return
+            x0, x1 = state["view"]
+            factor = 0.5 if getattr(event, "delta", 0) > 0 or getattr(event, "num", 0) == 4 else 2.0
+            center = x0 + event.x / max(canvas.winfo_width(), 1) * (x1 - x0)
+            state["view"] = (center - (center - x0) * factor, center + (x1 - center) * factor)
+            schedule()
+        
+        tk.Button(controls, text="▶", command=replot,
+                 bg=theme["operations_bg"], fg=theme["operations_fg"]).pack(side='left', padx=4)
+        canvas.bind('<Configure>', schedule)
+        canvas.bind('<ButtonPress-1>', start_drag)
+        canvas.bind('<B1-Motion>', drag)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            canvas.bind(sequence, zoom)
+        plot_window.bind('<Return>', replot)
+        replot()
+        return "break"
     
-    def calculate_power(self):
-        """Calculate power"""
-        if self.power_base is not None and self.power_count:
+    def open_stats(self, event=None):
+        """F8: statistics of a numeric file, scanned off the UI thread, C cancels"""
+        if self.stats_scan is not None:
+            return "break"
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(parent=self.window, filetypes=[
+            ("Numbers", "*.csv *.txt *.npy *.f64 *.bin"), ("All files", "*")])
+        if not path:
+            return "break"
+        import threading
+        import stream_stats
+        cancel = threading.Event()
+        events = queue.Queue()
+        name = os.path.basename(path)
+        self.stats_scan = cancel
+        
+        def work():
             try:
-                exponent = int(self.power_count)
-                if exponent >= 0:
-                    result = self.power_base ** exponent
-                    # Beautiful operation display
-                    operation_text = f"{self.power_base}ⁿ = {self.power_base}"
-                    if exponent > 1:
-                        operation_text += " × " + " × ".join([str(self.power_base)] * (exponent - 1))
-                    operation_text += f" = {result}"
-                    self.operation_label.config(text=operation_text)
-                    
-                    # Use Decimal for precise formatting
-                    result_str = f"{result:.10f}"
-                    result_str = result_str.rstrip('0').rstrip('.')
-                    
-                    self.current_input = result_str
-                    self.update_display()
-                
-                self.power_mode = False
-                self.power_base = None
-                self.power_count = ""
-                self.new_input = True
-                
-            except ValueError:
-                self.show_error(self.get_text("error_input"))
-    
-    def calculate(self):
-        """Main calculations with decimal precision"""
-        if self.power_mode and self.power_count:
-            self.calculate_power()
+                result = stream_stats.scan(path, progress=lambda fraction: events.put(("progress", fraction)),
+                                           cancel=cancel)
+            except stream_stats.Cancelled:
+                events.put(("cancelled", None))
+            except (OSError, RuntimeError, ValueError) as e:
+                events.put(("error", str(e)))
+            else:
+                events.put(("done", result))
+        
+        def poll():
+            fraction = None
+            while True:
+                try:
+                    kind, payload = events.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == "progress":
+                    fraction = payload
+                    continue
+                self.stats_scan = None
+                self.refresh()
+                if kind == "done":
+                    messagebox.showinfo(f"{self.get_text('stats_title')}: {name}",
+                                        stream_stats.format_report(payload))
+                    if payload["count"]:
+                        self.paste(repr(payload["mean"]))
+                elif kind == "error":
+                    self.show_error(payload)
+                return
+            if fraction is not None:
+                self.operation_label.config(text=f"📊 {name} {fraction:.0%}")
+            self.window.after(100, poll)
+        
+        self.operation_label.config(text=f"📊 {name}")
+        threading.Thread(target=work, name="stats-scan", daemon=True).start()
+        self.window.after(100, poll)
+        return "break"
+    
+    def start_recording(self, path=None):
+        """Record actions to a macro file, by default a new file in the config folder"""
+        from macro import MacroRecorder
+        if path is None:
+            folder = config_path("macros")
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, time.strftime("macro-%Y%m%d-%H%M%S.txt"))
+        try:
+            self.recorder = MacroRecorder(path, self.engine.precision)
+        except OSError as e:
+            print(f"❌ Could not record macro {path}: {e}")
             return
-            
-        if self.previous_input and self.current_input and self.operation:
-            try:
-                # Use Decimal for precise calculations
-                getcontext().prec = 20
-                
-                # Convert operation symbol for calculation
-                operation = self.operation
-                if operation == '÷':
-                    operation = '/'
-                elif operation == '×':
-                    operation = '*'
-                
-                prev = Decimal(self.previous_input)
-                curr = Decimal(self.current_input)
-                
-                operations = {
-                    '+': prev + curr,
-                    '-': prev - curr,
-                    '*': prev * curr,
-                    '/': prev / curr if curr != 0 else None
-                }
-                
-                if operation == '/' and curr == 0:
-                    self.show_error(self.get_text("error_division"))
-                    return
-                
-                result = operations[operation]
-                
-                # Convert to string and format nicely
-                result_str = f"{float(result):.10f}"  # Show up to 10 decimal places
-                
-                # Remove trailing zeros and unnecessary decimal point
-                result_str = result_str.rstrip('0').rstrip('.')
-                
-                # Handle edge cases
-                if result_str == '':
-                    result_str = '0'
-                elif result_str.startswith('.'):
-                    result_str = '0' + result_str
-                elif result_str.endswith('.'):
-                    result_str = result_str[:-1]
-                    
-                self.current_input = result_str
-                self.previous_input = ""
-                self.operation = None
-                self.new_input = True
-                self.update_display()
-                self.operation_label.config(text="")
-                
-            except ValueError:
-                self.show_error(self.get_text("error_input"))
-        elif self.operation and not self.current_input:
-            # If "=" pressed without second number, use previous result
-            self.current_input = self.previous_input
-            self.calculate()
+        print(f"⏺ Recording macro to {path}")
+    
+    def stop_recording(self):
+        """Finish the macro file"""
+        recorder, self.recorder = self.recorder, None
+        recorder.close()
+        print(f"⏹ Saved {recorder.count} actions to {recorder.path}")
+    
+    def toggle_recording(self, event=None):
+        """F9 starts or stops macro recording"""
+        if self.recorder is None:
+            self.start_recording()
+        else:
+            self.stop_recording()
+        return "break"
+    
+    def show_debug(self, event=None):
+        """Debug panel with cache counters"""
+        messagebox.showinfo("Debug", cache_report())
+        return "break"
+    
+    def schedule_refresh(self):
+        """Coalesce bursts of input into one redraw per idle cycle"""
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.window.after_idle(self.refresh)
+    
+    def evaluate_display(self, event=None):
+        """Evaluate the expression typed into the display"""
+        text = self.display.get()
+        if text.strip() and text != self.shown_text:
+            if self.recorder is not None:
+                self.recorder.record("expression", text)
+            self.engine.evaluate_expression(text)
+        else:
+            if self.recorder is not None:
+                self.recorder.record("key", '=')
+            self.engine.press('=')
+        self.refresh()
+        return "break"
+    
+    def refresh(self):
+        """Sync display and operation label with engine state"""
+        self.refresh_pending = False
+        self.update_display()
+        label = f"{self.engine.label} ⏳" if self.engine.busy is not None else self.engine.label
+        if self.operation_label.cget("text") != label:
+            self.operation_label.config(text=label)
+        if self.engine.error:
+            error, self.engine.error = self.engine.error, None
+            self.show_error(self.get_text(error))
     
     def show_error(self, message):
         """Show error message"""
         messagebox.showerror("Error", message)
-        self.clear()
-    
-    def clear(self):
-        """Clear calculator"""
-        self.current_input = ""
-        self.previous_input = ""
-        self.operation = None
-        self.power_mode = False
-        self.power_base = None
-        self.power_count = ""
-        self.new_input = True
-        self.update_display()
-        self.operation_label.config(text="")
     
-    def plus_minus(self):
-        """Change sign"""
-        if self.current_input and self.current_input != "0":
-            self.current_input = str(-float(self.current_input))
+    def on_display_resize(self, event):
+        """Refit the shown number when the window width changes"""
+        chars = max(event.width // self.char_width - 1, MIN_DISPLAY_CHARS)
+        if chars != self.display_chars:
+            self.display_chars = chars
             self.update_display()
     
-    def percentage(self):
-        """Percentage calculation"""
-        if self.current_input:
-            try:
-                value = float(self.current_input) / 100
-                # Remove trailing zeros
-                value_str = f"{value:.10f}"
-                value_str = value_str.rstrip('0').rstrip('.')
-                if value_str == '':
-                    value_str = '0'
-                self.current_input = value_str
-                self.update_display()
-            except ValueError:
-                self.show_error(self.get_text("error_input"))
-    
-    def input_decimal(self):
-        """Input decimal point"""
-        if '.' not in self.current_input:
-            self.current_input += '.' if self.current_input else "0."
-            self.update_display()
-    
-    def input_operation(self, op):
-        """Input operation"""
-        if self.power_mode and self.power_count:
-            self.calculate_power()
-            return
-            
-        if self.current_input:
-            # If operation already exists, calculate first
-            if self.previous_input and self.operation:
-                self.calculate()
-            
-            self.operation = op
-            self.previous_input = self.current_input
-            self.current_input = ""
-            self.new_input = True
-            self.operation_label.config(text=f"{self.previous_input} {self.operation}")
-        elif self.previous_input and not self.current_input:
-            # Change operation if second number not entered
-            self.operation = op
-            self.operation_label.config(text=f"{self.previous_input} {self.operation}")
-    
     def update_display(self):
         """Update display"""
-        self.display.delete(0, tk.END)
-        self.display.insert(0, self.current_input or "0")
+        text = self.engine.display_text(self.display_chars, self.settings["grouping"])
+        self.shown_text = text
+        if self.display.get() != text:
+            self.display.delete(0, tk.END)
+            self.display.insert(0, text)
+        if self.converter is not None:
+            self.update_conversion()
     
     def run(self):
         """Run application"""
         self.window.mainloop()
+    
+    def close(self):
+        """Stop this session's background work and destroy its window"""
+        if self.stats_scan is not None:
+            self.stats_scan.set()
+        if self.recorder is not None:
+            self.stop_recording()
+        self.engine.worker.cancel()
+        self.window.destroy()
+
+def cache_report():
+    """Hit/miss/eviction counters of the result and expression caches"""
+    from expression import compiler
+    lines = []
+    for name, cache in (("results", RESULT_CACHE), ("expressions", compiler.cache)):
+        stats = cache.stats()
+        lines.append(f"{name}: {stats['size']}/{stats['maxsize']} entries, {stats['bytes']} bytes, "
+                     f"{stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions, "
+                     f"hit rate {stats['hit_rate']:.1%}")
+    return "\n".join(lines)
+
+def profile_startup(budget_ms=None):
+    """Build the window, wait for the first paint and report startup phases"""
+    calculator = AdvancedCalculator()
+    started = time.perf_counter()
+    calculator.window.update_idletasks()
+    calculator.window.update()
+    calculator.startup_times["first_paint"] = time.perf_counter() - started
+    calculator.window.destroy()
+    
+    times = calculator.startup_times
+    total = sum(times.values())
+    print("Startup profile (ms):")
+    for phase, seconds in times.items():
+        print(f"  {phase:<14} {seconds * 1000:8.1f}")
+    print(f"  {'total':<14} {total * 1000:8.1f}")
+    
+    if budget_ms is not None and total * 1000 > budget_ms:
+        print(f"❌ Startup budget exceeded: {total * 1000:.1f} ms > {budget_ms:.1f} ms")
+        return 1
+    return 0
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+def precision_digits(text):
+    """argparse type for --precision: 1 to MAX_PRECISION significant digits"""
+    value = positive_int(text)
+    if value > MAX_PRECISION:
+        raise argparse.ArgumentTypeError(f"must be at most {MAX_PRECISION}, got {value}")
+    return value
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Calculator Plus")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report import, settings-load, widget-build and first-paint times, then exit")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="with --profile-startup, exit with status 1 when startup takes longer than MS")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="evaluate one expression per line from FILE (default stdin) and print results")
+    parser.add_argument("--workers", type=positive_int, default=1,
+                        help="with --batch or --serve, number of worker processes")
+    parser.add_argument("--chunk-size", type=positive_int, default=1000,
+                        help="with --batch, lines per worker task")
+    parser.add_argument("--precision", type=precision_digits, default=DEFAULT_PRECISION,
+                        help="significant digits for headless modes")
+    parser.add_argument("--column-op", metavar="OP",
+                        help="apply OP (+ - × ÷ %% xⁿ, or * / ^) to columns of --input and write --output")
+    parser.add_argument("--input", metavar="FILE",
+                        help="with --column-op, CSV or .npy source; with --convert, CSV source (default stdin)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="with --column-op, CSV or .npy target; with --convert, CSV target (default stdout)")
+    parser.add_argument("--scalar", metavar="X",
+                        help="with --column-op, combine the first column with X instead of the second column")
+    parser.add_argument("--exact", action="store_true",
+                        help="with --column-op, use Decimal at --precision instead of float64; "
+                             "with --stats, also print an exact Decimal sum")
+    parser.add_argument("--stats", metavar="FILE",
+                        help="print count, mean, variance, min/max and quantiles of a CSV, .npy or "
+                             "raw float64 (.f64/.bin) file")
+    parser.add_argument("--column", type=int, default=0,
+                        help="with --stats or --convert, CSV column to read (0-based)")
+    parser.add_argument("--convert", nargs=2, metavar=("FROM", "TO"),
+                        help="convert a column of values between units at --precision (see units.txt)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="record button and key actions to a macro FILE (F9 toggles recording)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay a macro FILE headless at full speed and print the final state")
+    parser.add_argument("--render-every", type=int, default=0, metavar="N",
+                        help="with --replay, render the display once every N actions (0: never)")
+    parser.add_argument("--serve", action="store_true",
+                        help="run the headless HTTP/NDJSON calculation service (see service.py)")
+    parser.add_argument("--host", default="127.0.0.1", help="with --serve, address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="with --serve, TCP port")
+    parser.add_argument("--socket", metavar="PATH", help="with --serve, listen on a Unix socket instead")
+    parser.add_argument("--max-concurrency", type=positive_int, default=64,
+                        help="with --serve, requests evaluated at the same time")
+    parser.add_argument("--stats-interval", type=float, default=10.0, metavar="SECONDS",
+                        help="with --serve, period of the throughput/latency report on stderr")
+    parser.add_argument("--metrics", metavar="FILE", default=os.environ.get("CALCULATOR_METRICS"),
+                        help="record latency histograms and event-loop lag, export to FILE "
+                             "(.prom/.txt for Prometheus text, JSON otherwise)")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, metavar="SECONDS",
+                        help="with --metrics, export period")
+    parser.add_argument("--sessions", type=int, metavar="N",
+                        help="open N calculator sessions in one process sharing themes and languages "
+                             "(Ctrl+N opens another), report RSS per session")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="print cache hit/miss/eviction counters at exit")
+    return parser.parse_args(argv)
 
 def main():
     """Main entry point with error handling"""
+    args = parse_args()
+    if args.cache_stats:
+        import atexit
+        atexit.register(lambda: print(cache_report(), file=sys.stderr))
+    if args.batch:
+        import batch
+        sys.exit(batch.main(args.batch, args.workers, args.chunk_size, args.precision))
+    if args.stats:
+        import stream_stats
+        sys.exit(stream_stats.main(args.stats, args.column, args.exact))
+    if args.convert:
+        import units
+        sys.exit(units.main(*args.convert, args.input, args.output, args.column, args.precision))
+    if args.replay:
+        import macro
+        sys.exit(macro.main(args.replay, args.render_every))
+    if args.serve:
+        import service
+        sys.exit(service.main(args.host, args.port, args.socket, args.precision, args.workers,
+                              args.max_concurrency, args.stats_interval))
+    if args.column_op:
+        import vectorized
+        if not (args.input and args.output):
+            print("❌ --column-op needs --input and --output")
+            sys.exit(2)
+        sys.exit(vectorized.main(args.column_op, args.input, args.output, args.scalar,
+                                 args.chunk_size, args.precision if args.exact else None))
+    if not HAS_TK:
+        print("❌ The calculator window needs tkinter (python3-tk); headless modes such as "
+              "--serve and --batch work without it")
+        sys.exit(1)
+    if args.profile_startup:
+        sys.exit(profile_startup(args.startup_budget))
+    if args.sessions:
+        import sessions
+        sys.exit(sessions.main(AdvancedCalculator, args.sessions))
+    
     try:
         calculator = AdvancedCalculator()
+        if args.record:
+            calculator.start_recording(args.record)
+        if args.metrics:
+            import instrumentation
+            instrumentation.enable(calculator, args.metrics, args.metrics_interval)
         calculator.run()
     except Exception as e:
         error_msg = f"Fatal error:\n{str(e)}\n\n{traceback.format_exc()}"
@@ -615,4 +1149,4 @@ def main():
         show_error_dialog(error_msg)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,621 @@
+import numbers
+import re
+from decimal import Context, Decimal, MAX_EMAX, MIN_EMIN
+
+from cache import LRUCache
+
+# Error keys reported by the engine, resolved to text by the GUI
+ERROR_DIVISION = "error_division"
+ERROR_INPUT = "error_input"
+
+OPERATIONS = ('÷', '×', '-', '+')
+NUMBER = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+DEFAULT_PRECISION = 20
+PRECISION_MODES = (20, 100, 1000)  # significant digits offered in settings
+MAX_PRECISION = 10000  # largest precision headless modes and service requests accept
+LABEL_TERMS = 10  # longest product written out in full in the power label
+RESULT_PLACES = 10
+MASKED_TEXT = "Error"  # cell text for values that could not be computed (column modes)
+# Significant digits a width-limited display keeps before switching to scientific notation
+MIN_SIGNIFICANT = 4
+# Thousands separator: a narrow no-break space, not ',' (a decimal comma to the
+# key map and expression parser). Paste and expressions drop whitespace, so
+# grouped text copied from the display reads back as the same number.
+GROUP_SEPARATOR = "\u202f"
+
+# Exponents with at least this many digits skip exponentiation by squaring (see power)
+MAX_SQUARING_DIGITS = 30
+# Estimated microseconds above which a job leaves the UI thread (see estimate_cost)
+HEAVY_COST = 20_000
+# compute() at 1000 digits in microseconds, from benchmarks/bench_precision.py
+MULTIPLY_US = 30
+FRACTIONAL_POWER_US = 35_000
+
+# Formatted results keyed on (operator, operands, precision), shared by all engines.
+# Decimal keys compare by value, so 2.50 and 2.5 hit the same entry.
+RESULT_CACHE = LRUCache(maxsize=4096, max_bytes=16 * 1024 * 1024)
+
+CONTEXTS = {}
+
+
+def make_context(precision=DEFAULT_PRECISION):
+    """Local Decimal context, exponent range wide enough for huge results"""
+    return Context(prec=precision, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+def get_context(precision):
+    """Shared context per precision"""
+    context = CONTEXTS.get(precision)
+    if context is None:
+        context = CONTEXTS[precision] = make_context(precision)
+    return context
+
+
+def result_places(precision):
+    """Shown decimal places keep a few guard digits below the precision"""
+    return max(precision - 10, RESULT_PLACES)
+
+
+def error_key(exc):
+    """Engine error key for an exception raised by compute()"""
+    return ERROR_DIVISION if isinstance(exc, ZeroDivisionError) else ERROR_INPUT
+
+
+def compute(kind, a, b, precision):
+    """Formatted result of one operation, pure so it can run in a worker process
+
+    kind is '+', '-', '×', '÷' (a op b), 'xⁿ' (a to the power b) or '%'
+    (a / 100, b unused). Division by zero raises ZeroDivisionError.
+    """
+    context = get_context(precision)
+    if kind == '+':
+        result = context.add(a, b)
+    elif kind == '-':
+        result = context.subtract(a, b)
+    elif kind == '×':
+        result = context.multiply(a, b)
+    elif kind == '÷':
+        if b == 0:
+            raise ZeroDivisionError("Division by zero")
+        result = context.divide(a, b)
+    elif kind == 'xⁿ':
+        result = power(a, b, context)
+    else:
+        result = context.divide(a, 100)
+    return format_result(result, result_places(precision))
+
+
+def estimate_cost(kind, a, b, precision):
+    """Rough compute() time in microseconds, fitted to measured timings
+
+    Multiplication and division grow about quadratically with the precision
+    up to a few thousand digits, fractional powers (exp/ln series) about
+    with its cube; integer powers are two multiplications per exponent bit.
+    """
+    scale = precision / 1000
+    if kind in ('+', '-', '%'):
+        return 10 * scale + 2
+    multiply = MULTIPLY_US * scale * scale + 2
+    if kind in ('×', '÷') or b.adjusted() >= MAX_SQUARING_DIGITS:
+        # Huge exponents are decided by Decimal's overflow checks, see power()
+        return multiply
+    if b != b.to_integral_value():
+        return FRACTIONAL_POWER_US * scale ** 3.2
+    # About 3.3 bits per exponent digit
+    return 7 * (b.adjusted() + 1) * multiply
+
+
+def power(base, exponent, context):
+    """Raise Decimal base to Decimal exponent
+
+    Integer exponents use exponentiation by squaring, so the cost is
+    O(log n) multiplications and memory stays bounded by the precision.
+    Negative exponents take the reciprocal, fractional ones go through
+    Decimal's own power (positive bases only). Exponents of
+    MAX_SQUARING_DIGITS digits or more are never turned into an int: unless
+    |base| is 0 or 1 the result overflows or underflows, which Decimal's
+    power detects from the sizes alone.
+    """
+    if exponent.adjusted() >= MAX_SQUARING_DIGITS:
+        if not base:
+            if exponent < 0:
+                raise ZeroDivisionError("Division by zero")
+            return Decimal(0)
+        result = context.power(base, exponent)
+        return Decimal(0) if not result else result
+    if exponent != exponent.to_integral_value():
+        return context.power(base, exponent)
+
+    n = int(exponent)
+    if n == 0:
+        return Decimal(1)
+
+    # A few guard digits absorb rounding from the intermediate products
+    work = context.copy()
+    work.prec = context.prec + len(str(abs(n))) + 2
+    result = Decimal(1)
+    square = base
+    remaining = abs(n)
+    while remaining:
+        if remaining & 1:
+            result = work.multiply(result, square)
+        remaining >>= 1
+        if remaining:
+            square = work.multiply(square, square)
+
+    if n < 0:
+        return context.divide(Decimal(1), result)
+    return context.plus(result)
+
+
+def power_label(base, exponent_text):
+    """Describe base^exponent with a bounded-size product"""
+    try:
+        count = int(exponent_text or 0)
+    except ValueError:
+        return f"{base}ⁿ = {base}^{exponent_text}"
+    if count < 1:
+        return f"{base}ⁿ = {base}^{exponent_text or 0}"
+    if count <= LABEL_TERMS:
+        return f"{base}ⁿ = " + " × ".join([str(base)] * count)
+    return f"{base}ⁿ = {base} × {base} × … × {base} ({count:,} times)"
+
+
+def to_decimal(value):
+    """Exact Decimal for strings, integers (numpy's too) and floats via their shortest repr"""
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, str):
+        return Decimal(value.strip())
+    if isinstance(value, numbers.Integral):
+        return Decimal(int(value))
+    return Decimal(repr(float(value)))
+
+
+def format_result(value, places=RESULT_PLACES, width=None, grouping=False):
+    """Format a Decimal or int without going through float
+
+    Fixed-point up to `places` decimals, scientific notation outside that
+    range. With `width` (characters) the notation and number of digits are
+    chosen so the text fits; `grouping` adds thousands separators. The cost is
+    bounded by places and width, not by the magnitude of the value.
+    """
+    if not isinstance(value, Decimal):
+        value = Decimal(value)
+    if not value.is_finite():
+        return str(value)
+    if width is not None:
+        return fit_result(value, places, width, grouping)
+    if value and not -places <= value.adjusted() < max(20, places):
+        return scientific(value)
+    return fixed(value, places, grouping)
+
+
+def fixed(value, places, grouping=False):
+    """Fixed-point text rounded to places decimals, trailing zeros stripped"""
+    result_str = f"{value:{',' if grouping else ''}.{places}f}".replace(',', GROUP_SEPARATOR)
+    result_str = result_str.rstrip('0').rstrip('.') if '.' in result_str else result_str
+    if result_str in ('', '-0'):
+        result_str = '0'
+    return result_str
+
+
+def group_typed(text):
+    """Thousands separators in a number as typed, decimals and a trailing point kept"""
+    sign = '-' if text.startswith('-') else ''
+    integer, point, decimals = text[len(sign):].partition('.')
+    head = len(integer) % 3 or 3
+    groups = [integer[:head]] + [integer[i:i + 3] for i in range(head, len(integer), 3)]
+    return sign + GROUP_SEPARATOR.join(groups) + point + decimals
+
+
+def scientific(value, digits=None):
+    """Scientific text with at most digits decimals in the mantissa"""
+    mantissa, _, exponent = f"{value:{'' if digits is None else f'.{digits}'}e}".partition("e")
+    if '.' in mantissa:
+        mantissa = mantissa.rstrip('0').rstrip('.')
+    return f"{mantissa}e{exponent}"
+
+
+def fit_result(value, places, width, grouping):
+    """Shortest faithful text for a field width characters wide"""
+    if not value:
+        return "0"
+    adjusted = value.adjusted()
+    sign = 1 if value < 0 else 0
+    integer_digits = max(adjusted + 1, 1)
+    integer_width = sign + integer_digits + ((integer_digits - 1) // 3 if grouping else 0)
+
+    if -places <= adjusted and integer_width <= width:
+        decimals = min(places, max(width - integer_width - 1, 0))
+        # Small numbers stay fixed only while a few significant digits remain visible
+        significant = len("".join(map(str, value.as_tuple().digits)).rstrip('0')) or 1
+        if adjusted >= 0 or decimals + adjusted + 1 >= min(significant, MIN_SIGNIFICANT):
+            result_str = fixed(value, decimals, grouping)
+            if len(result_str) <= width:
+                return result_str
+
+    # sign, one digit, point and the exponent take the rest of the field
+    exponent_width = len(f"e{adjusted:+d}")
+    digits = max(width - sign - 2 - exponent_width, 0)
+    return scientific(value, min(digits, places))
+
+
+class CalculatorEngine:
+    """Headless calculator state machine (no Tk required)
+
+    Keys are the non-localized button symbols: digits, '.', '+', '-', '×', '÷',
+    '=', 'C', '⌫', '±', '%' and 'xⁿ'. '*', '/' and '^' are accepted as aliases
+    so plain strings like "12^3=" can be fed to run().
+    """
+    # One engine per calculator session, several can share a process
+    __slots__ = ("power_prompt", "cache", "on_result", "worker", "actions", "precision", "context",
+                 "places", "current_input", "previous_input", "operation", "power_mode",
+                 "power_base", "power_count", "new_input", "display", "label", "error", "busy",
+                 "queued_operation")
+
+    def __init__(self, power_prompt="ⁿ (enter power)", precision=DEFAULT_PRECISION, cache=None):
+        self.power_prompt = power_prompt
+        self.cache = RESULT_CACHE if cache is None else cache
+        self.on_result = None  # callback(operator, a, b, result) for the history tape
+        self.worker = None  # optional job runner with submit(job, callback) and cancel()
+        self.set_precision(precision)
+        self.actions = {
+            '.': self.input_decimal,
+            '=': self.calculate,
+            'C': self.clear,
+            '⌫': self.backspace,
+            '±': self.plus_minus,
+            '%': self.percentage,
+            'xⁿ': self.power_function,
+            '^': self.power_function,
+        }
+        for digit in '0123456789':
+            self.actions[digit] = lambda d=digit: self.input_number(d)
+        for op, alias in zip(OPERATIONS, ('/', '*', '-', '+')):
+            self.actions[op] = self.actions[alias] = lambda o=op: self.input_operation(o)
+        self.reset()
+
+    def set_precision(self, precision):
+        """Switch to a new number of significant digits"""
+        self.precision = precision
+        self.context = get_context(precision)
+        self.places = result_places(precision)
+
+    def reset(self):
+        """Reset state, display and label"""
+        self.current_input = ""
+        self.previous_input = ""
+        self.operation = None
+        self.power_mode = False
+        self.power_base = None
+        self.power_count = ""
+        self.new_input = True
+        self.display = "0"
+        self.label = ""
+        self.error = None
+        self.busy = None  # job key while an offloaded computation runs
+        self.queued_operation = None
+
+    def press(self, key):
+        """Handle a single keystroke, unknown keys are ignored
+
+        While an offloaded job runs only 'C' (which cancels it) is accepted.
+        """
+        if self.busy is not None and key != 'C':
+            return
+        action = self.actions.get(key)
+        if action is not None:
+            action()
+
+    def run(self, keys):
+        """Feed a whole keystroke sequence and return the display text"""
+        actions = self.actions
+        for key in keys:
+            action = actions.get(key)
+            if action is not None:
+                action()
+        return self.display
+
+    def run_many(self, sequences):
+        """Evaluate many independent keystroke sequences, one result per sequence"""
+        results = []
+        for keys in sequences:
+            self.reset()
+            results.append(self.run(keys))
+        return results
+
+    def update_display(self):
+        """Update display text"""
+        self.display = self.current_input or "0"
+
+    def display_text(self, width, grouping=False):
+        """Display fitted to width characters, numbers still being typed are kept as typed"""
+        text = self.display
+        if not NUMBER.fullmatch(text):
+            return text
+        if not self.new_input:
+            # Typed digits are never rounded or switched to scientific notation
+            return group_typed(text) if grouping and 'e' not in text.lower() else text
+        return format_result(Decimal(text), self.places, width=width, grouping=grouping)
+
+    def run_job(self, kind, a, b, finish):
+        """Compute one operation and pass the formatted result to finish
+
+        Cached results and cheap jobs run synchronously; jobs estimated above
+        HEAVY_COST go to self.worker when one is attached.
+        """
+        key = (kind, a, b, self.precision)
+        result_str = self.cache.get(key)
+        if result_str is not None:
+            finish(result_str)
+            return
+
+        if self.worker is not None and estimate_cost(kind, a, b, self.precision) > HEAVY_COST:
+            self.busy = key
+            self.worker.submit(key, lambda result_str, error: self.job_done(key, finish, result_str, error))
+            return
+
+        try:
+            result_str = compute(*key)
+        except (ValueError, ArithmeticError) as e:
+            self.fail(error_key(e))
+            return
+        self.cache.put(key, result_str)
+        finish(result_str)
+
+    def job_done(self, key, finish, result_str, error):
+        """Apply an offloaded result (call on the UI thread), ignored if cancelled"""
+        if self.busy != key:
+            return
+        self.busy = None
+        if error:
+            self.fail(error)
+            return
+        self.cache.put(key, result_str)
+        finish(result_str)
+        if self.queued_operation:
+            op, self.queued_operation = self.queued_operation, None
+            self.input_operation(op)
+
+    def record(self, operator, a, b, result):
+        """Report a finished calculation to the listener"""
+        if self.on_result is not None:
+            self.on_result(operator, a, b, result)
+
+    def fail(self, error):
+        """Record an error and clear the calculator"""
+        self.clear()
+        self.error = error
+
+    def backspace(self):
+        """Delete last character"""
+        if self.current_input:
+            self.current_input = self.current_input[:-1]
+            self.update_display()
+
+    def input_number(self, num):
+        """Input number"""
+        if self.power_mode:
+            if self.power_base is not None:
+                self.power_count += num
+                self.label = power_label(self.power_base, self.power_count)
+            return
+
+        # If it's new input (after operation), clear field
+        if self.new_input:
+            self.current_input = ""
+            self.new_input = False
+
+        if self.current_input == "0":
+            self.current_input = num
+        else:
+            self.current_input += num
+        self.update_display()
+
+    def power_function(self):
+        """Activate power mode"""
+        if self.current_input:
+            try:
+                base = Decimal(self.current_input)
+            except (ValueError, ArithmeticError):
+                self.fail(ERROR_INPUT)
+                return
+            self.power_mode = True
+            self.power_base = base
+            self.power_count = ""
+            self.label = f"{self.current_input}{self.power_prompt}"
+            self.current_input = ""
+            self.new_input = True
+            self.update_display()
+        elif self.power_mode and self.power_count:
+            self.calculate_power()
+
+    def calculate_power(self):
+        """Calculate power"""
+        if self.power_base is not None and self.power_count:
+            try:
+                exponent = Decimal(self.power_count)
+            except (ValueError, ArithmeticError):
+                self.fail(ERROR_INPUT)
+                return
+            base, count = self.power_base, self.power_count
+
+            def finish(result_str):
+                self.label = f"{power_label(base, count)} = {result_str}"
+                self.record('xⁿ', str(base), count, result_str)
+
+                self.current_input = result_str
+                self.update_display()
+
+                self.power_mode = False
+                self.power_base = None
+                self.power_count = ""
+                self.new_input = True
+
+            self.run_job('xⁿ', base, exponent, finish)
+
+    def calculate(self):
+        """Main calculations with decimal precision"""
+        if self.power_mode and self.power_count:
+            self.calculate_power()
+            return
+
+        if self.previous_input and self.current_input and self.operation:
+            try:
+                prev = Decimal(self.previous_input)
+                curr = Decimal(self.current_input)
+            except (ValueError, ArithmeticError):
+                self.fail(ERROR_INPUT)
+                return
+
+            if self.operation == '÷' and curr == 0:
+                self.fail(ERROR_DIVISION)
+                return
+
+            operation, a_text, b_text = self.operation, self.previous_input, self.current_input
+
+            def finish(result_str):
+                self.record(operation, a_text, b_text, result_str)
+                self.current_input = result_str
+                self.previous_input = ""
+                self.operation = None
+                self.new_input = True
+                self.update_display()
+                self.label = ""
+
+            # Exact Decimal arithmetic in the engine's own context
+            self.run_job(operation, prev, curr, finish)
+        elif self.operation and not self.current_input and self.previous_input:
+            # If "=" pressed without second number, use previous result
+            self.current_input = self.previous_input
+            self.calculate()
+
+    def paste(self, text):
+        """Take pasted text in one step: a number becomes the input, anything else is evaluated"""
+        text = "".join(text.split())
+        if not text or self.busy is not None:
+            return
+        if not NUMBER.fullmatch(text):
+            self.evaluate_expression(text)
+        elif self.power_mode and self.power_base is not None:
+            self.power_count = text
+            self.label = power_label(self.power_base, self.power_count)
+        else:
+            self.current_input = text
+            self.new_input = False
+            self.update_display()
+
+    def evaluate_expression(self, text):
+        """Evaluate a typed or pasted expression (see expression.py) and show the result
+
+        Ignored while an offloaded job runs, like every key but 'C'.
+        """
+        from expression import compiler
+
+        if self.busy is not None:
+            return
+
+        try:
+            result_str = format_result(compiler.evaluate(text, self.context), self.places)
+        except ZeroDivisionError:
+            self.fail(ERROR_DIVISION)
+            return
+        except (ValueError, ArithmeticError):
+            self.fail(ERROR_INPUT)
+            return
+
+        self.record('=', text.strip(), "", result_str)
+        self.clear()
+        self.current_input = result_str
+        self.update_display()
+        self.label = f"{text.strip()} ="
+
+    def clear(self):
+        """Clear calculator, cancelling an offloaded job"""
+        if self.busy is not None:
+            self.busy = None
+            self.worker.cancel()
+        self.queued_operation = None
+        self.current_input = ""
+        self.previous_input = ""
+        self.operation = None
+        self.power_mode = False
+        self.power_base = None
+        self.power_count = ""
+        self.new_input = True
+        self.update_display()
+        self.label = ""
+
+    def plus_minus(self):
+        """Change sign"""
+        if self.power_mode and self.power_base is not None:
+            # Negative exponent
+            if self.power_count.startswith('-'):
+                self.power_count = self.power_count[1:]
+            else:
+                self.power_count = '-' + self.power_count
+            self.label = power_label(self.power_base, self.power_count)
+            return
+        if self.current_input and self.current_input != "0":
+            # Toggle the sign on the text itself, no float round-trip
+            if self.current_input.startswith('-'):
+                self.current_input = self.current_input[1:]
+            else:
+                self.current_input = '-' + self.current_input
+            self.update_display()
+
+    def percentage(self):
+        """Percentage calculation"""
+        if self.current_input:
+            try:
+                value = Decimal(self.current_input)
+            except (ValueError, ArithmeticError):
+                self.fail(ERROR_INPUT)
+                return
+            text = self.current_input
+
+            def finish(value_str):
+                self.record('%', text, "", value_str)
+                self.current_input = value_str
+                self.update_display()
+
+            self.run_job('%', value, None, finish)
+
+    def input_decimal(self):
+        """Input decimal point"""
+        if self.power_mode and self.power_base is not None:
+            # Fractional exponent
+            if '.' not in self.power_count:
+                self.power_count += '.' if self.power_count.lstrip('-') else "0."
+                self.label = power_label(self.power_base, self.power_count)
+            return
+        if '.' not in self.current_input:
+            self.current_input += '.' if self.current_input else "0."
+            self.update_display()
+
+    def input_operation(self, op):
+        """Input operation"""
+        if self.power_mode and self.power_count:
+            self.calculate_power()
+            return
+
+        if self.current_input:
+            # If operation already exists, calculate first
+            if self.previous_input and self.operation:
+                self.calculate()
+                if self.busy is not None:
+                    # Continue once the offloaded result is back
+                    self.queued_operation = op
+                    return
+
+            self.operation = op
+            self.previous_input = self.current_input
+            self.current_input = ""
+            self.new_input = True
+            self.label = f"{self.previous_input} {self.operation}"
+        elif self.previous_input and not self.current_input:
+            # Change operation if second number not entered
+            self.operation = op
+            self.label = f"{self.previous_input} {self.operation}"
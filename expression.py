@@ -0,0 +1,227 @@
+"""Typed expressions: parsing, compilation to stack code and a compiled-code cache
+
+Grammar (lowest to highest precedence):
+
+    expr    := term (('+' | '-') term)*
+    term    := unary (('*' | '/') unary)*
+    unary   := ('-' | '+') unary | power
+    power   := postfix ('^' unary)?        right associative, -2^2 = -4
+    postfix := primary '%'*                x% = x / 100
+    primary := NUMBER | 'x' | '#' LINE | '(' expr ')'
+
+'#3' is the result of line 3 of a worksheet (see worksheet.py), 'x' the
+variable of plot mode (see plot.py).
+"""
+import math
+import re
+from decimal import Decimal
+
+from cache import LRUCache
+from engine import estimate_cost, make_context, power
+
+# Opcodes of the compiled stack code
+PUSH, ADD, SUB, MUL, DIV, POW, NEG, PCT, LOAD, VAR = range(10)
+BINARY = {'+': ADD, '-': SUB, '*': MUL, '/': DIV}
+
+TOKEN = re.compile(r"\s*(?:(\d+\.?\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?)|#(\d+)|(.))")
+NORMALIZE = str.maketrans({'×': '*', '÷': '/', '−': '-', ',': '.', 'X': 'x'})
+
+
+class ExpressionError(ValueError):
+    """Malformed expression"""
+
+
+def normalize(text):
+    """Canonical form used as the cache key"""
+    return "".join(text.translate(NORMALIZE).split())
+
+
+def tokenize(text):
+    """Split normalized text into numbers, line references (int) and single-character operators"""
+    tokens = []
+    for number, line, symbol in TOKEN.findall(text):
+        if number:
+            tokens.append(Decimal(number))
+        elif line:
+            tokens.append(int(line))
+        elif symbol in "+-*/^%()x":
+            tokens.append(symbol)
+        else:
+            raise ExpressionError(f"Unexpected character {symbol!r}")
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser emitting stack code directly"""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.code = []
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Empty expression")
+        try:
+            self.expr()
+        except RecursionError:
+            raise ExpressionError("Expression is nested too deeply") from None
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"Unexpected {self.peek()!r}")
+        return tuple(self.code)
+
+    def expr(self):
+        self.term()
+        while self.peek() in ('+', '-'):
+            op = self.take()
+            self.term()
+            self.code.append((BINARY[op], None))
+
+    def term(self):
+        self.unary()
+        while self.peek() in ('*', '/'):
+            op = self.take()
+            self.unary()
+            self.code.append((BINARY[op], None))
+
+    def unary(self):
+        if self.peek() in ('-', '+'):
+            negate = self.take() == '-'
+            self.unary()
+            if negate:
+                self.code.append((NEG, None))
+        else:
+            self.power()
+
+    def power(self):
+        self.postfix()
+        if self.peek() == '^':
+            self.take()
+            self.unary()
+            self.code.append((POW, None))
+
+    def postfix(self):
+        self.primary()
+        while self.peek() == '%':
+            self.take()
+            self.code.append((PCT, None))
+
+    def primary(self):
+        token = self.take()
+        if isinstance(token, Decimal):
+            self.code.append((PUSH, token))
+        elif isinstance(token, int):
+            self.code.append((LOAD, token))
+        elif token == 'x':
+            self.code.append((VAR, None))
+        elif token == '(':
+            self.expr()
+            if self.take() != ')':
+                raise ExpressionError("Missing ')'")
+        else:
+            raise ExpressionError(f"Unexpected {token!r}")
+
+
+def parse(text):
+    """Compile expression text to a tuple of (opcode, argument) pairs"""
+    return Parser(tokenize(normalize(text))).parse()
+
+
+def references(code):
+    """Line numbers referenced by compiled code"""
+    return {arg for opcode, arg in code if opcode == LOAD}
+
+
+def cost(code, precision):
+    """Rough microseconds to run compiled code (see engine.estimate_cost)
+
+    Powers are sized from a literal exponent; an exponent that is itself
+    computed cannot be sized in advance and makes the cost infinite.
+    """
+    total = 0
+    for index, (opcode, arg) in enumerate(code):
+        if opcode == POW:
+            before = index - 1
+            while before >= 0 and code[before][0] == NEG:
+                before -= 1
+            if before < 0 or code[before][0] != PUSH:
+                return math.inf
+            total += estimate_cost('xⁿ', None, code[before][1], precision)
+        elif opcode in (MUL, DIV):
+            total += estimate_cost('×', None, None, precision)
+        elif opcode != PUSH:
+            total += estimate_cost('+', None, None, precision)
+    return total
+
+
+def execute(code, context, lines=None, x=None):
+    """Run compiled code in a Decimal context, division by zero raises ZeroDivisionError
+
+    lines maps referenced line numbers to their values, x is the plot variable.
+    """
+    stack = []
+    push, pop = stack.append, stack.pop
+    for opcode, arg in code:
+        if opcode == PUSH:
+            push(arg)
+        elif opcode == LOAD:
+            value = lines.get(arg) if lines is not None else None
+            if value is None:
+                raise ExpressionError(f"Line {arg} has no result")
+            push(value)
+        elif opcode == VAR:
+            if x is None:
+                raise ExpressionError("x is only defined in plot mode")
+            push(x)
+        elif opcode == NEG:
+            push(context.minus(pop()))
+        elif opcode == PCT:
+            push(context.divide(pop(), 100))
+        else:
+            b = pop()
+            a = pop()
+            if opcode == ADD:
+                push(context.add(a, b))
+            elif opcode == SUB:
+                push(context.subtract(a, b))
+            elif opcode == MUL:
+                push(context.multiply(a, b))
+            elif opcode == DIV:
+                if b == 0:
+                    raise ZeroDivisionError("Division by zero")
+                push(context.divide(a, b))
+            else:
+                push(power(a, b, context))
+    return stack[0]
+
+
+class ExpressionCompiler:
+    """Parses expressions once and keeps compiled code in a bounded LRU cache"""
+
+    def __init__(self, maxsize=1024):
+        self.cache = LRUCache(maxsize)
+
+    def compile(self, text):
+        """Compiled code for text, parsed only on a cache miss"""
+        key = normalize(text)
+        code = self.cache.get(key)
+        if code is None:
+            code = Parser(tokenize(key)).parse()
+            self.cache.put(key, code)
+        return code
+
+    def evaluate(self, text, context=None):
+        """Evaluate text to a Decimal"""
+        return execute(self.compile(text), context or make_context())
+
+
+# Shared compiler, cache.stats() exposes hit/miss counts
+compiler = ExpressionCompiler()
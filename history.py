@@ -0,0 +1,188 @@
+"""Calculation history: fixed-size records in an append-only memory-mapped log
+
+File layout: 16 byte header (magic + record count) followed by RECORD.size
+byte records. Appends are queued and written by a background thread, so the
+Tk loop never waits on disk. A small ring buffer keeps the newest records in
+memory for the tape panel.
+"""
+import atexit
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from decimal import Decimal, InvalidOperation
+
+from settings_store import config_path
+
+MAGIC = b"CPHIST1\0"
+HEADER = struct.Struct("<8sQ")
+# timestamp, operator, first operand, second operand, result
+RECORD = struct.Struct("<d8s40s40s40s")
+GROW_BYTES = 1 << 20
+HISTORY_FILE = "calculator_history.bin"
+
+
+def fit(text, size):
+    """Encode text into at most size bytes, long numbers switch to scientific notation"""
+    data = text.encode("utf-8")
+    if len(data) <= size:
+        return data
+    try:
+        digits = size - 12
+        data = f"{Decimal(text):.{digits}e}".encode("ascii")
+        if len(data) <= size:
+            return data
+    except (InvalidOperation, ValueError):
+        pass
+    return data[:size - 3].decode("utf-8", "ignore").encode("utf-8") + "…".encode("utf-8")
+
+
+class HistoryRecord:
+    """One calculation"""
+    __slots__ = ("timestamp", "operator", "a", "b", "result")
+
+    def __init__(self, timestamp, operator, a, b, result):
+        self.timestamp = timestamp
+        self.operator = operator
+        self.a = a
+        self.b = b
+        self.result = result
+
+    def pack(self):
+        return RECORD.pack(self.timestamp, fit(self.operator, 8), fit(self.a, 40),
+                           fit(self.b, 40), fit(self.result, 40))
+
+    @classmethod
+    def unpack_from(cls, buffer, offset):
+        timestamp, *fields = RECORD.unpack_from(buffer, offset)
+        return cls(timestamp, *(f.rstrip(b"\0").decode("utf-8", "replace") for f in fields))
+
+    def __str__(self):
+        if self.operator == "xⁿ":
+            return f"{self.a}^{self.b} = {self.result}"
+        if self.b:
+            return f"{self.a} {self.operator} {self.b} = {self.result}"
+        if self.operator == "%":
+            return f"{self.a}% = {self.result}"
+        return f"{self.a} = {self.result}"
+
+
+class HistoryLog:
+    """Append-only history file with a background writer and an in-memory tape"""
+
+    def __init__(self, path=None, tape_size=200):
+        self.path = path or config_path(HISTORY_FILE)
+        self.lock = threading.Lock()
+        self.tape = deque(maxlen=tape_size)
+        self.pending = queue.Queue()
+        self.open_file()
+        self.tape.extend(self.records(max(0, self.count - tape_size), self.count))
+        self.writer = threading.Thread(target=self.write_loop, name="history-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def open_file(self):
+        """Open or create the log and map it"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size
+        self.file = open(self.path, "w+b" if new else "r+b")
+        if new:
+            self.file.write(HEADER.pack(MAGIC, 0))
+            self.file.truncate(GROW_BYTES)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        magic, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a calculator history file")
+        # Never trust a count that points past the mapped data
+        self.count = min(count, (len(self.map) - HEADER.size) // RECORD.size)
+
+    def append(self, operator, a, b, result):
+        """Record a calculation, returns immediately"""
+        record = HistoryRecord(time.time(), operator, a, b, result)
+        self.tape.append(record)
+        self.pending.put(record)
+        return record
+
+    def write_loop(self):
+        """Writer thread: drain the queue into the mapped file"""
+        while True:
+            record = self.pending.get()
+            if record is None:
+                return
+            batch = [record]
+            while True:
+                try:
+                    record = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    self.write(batch)
+                    return
+                batch.append(record)
+            self.write(batch)
+
+    def write(self, records):
+        """Append packed records and bump the header count"""
+        data = b"".join(record.pack() for record in records)
+        with self.lock:
+            offset = HEADER.size + self.count * RECORD.size
+            if offset + len(data) > len(self.map):
+                self.map.close()
+                self.file.truncate(offset + len(data) + GROW_BYTES)
+                self.map = mmap.mmap(self.file.fileno(), 0)
+            self.map[offset:offset + len(data)] = data
+            self.count += len(records)
+            HEADER.pack_into(self.map, 0, MAGIC, self.count)
+
+    def __len__(self):
+        return self.count
+
+    def get(self, index):
+        """Record by index, O(1)"""
+        with self.lock:
+            if not 0 <= index < self.count:
+                raise IndexError(index)
+            return HistoryRecord.unpack_from(self.map, HEADER.size + index * RECORD.size)
+
+    def records(self, start, stop):
+        """Records in [start, stop), used for paging through the tape"""
+        with self.lock:
+            stop = min(stop, self.count)
+            return [HistoryRecord.unpack_from(self.map, HEADER.size + i * RECORD.size)
+                    for i in range(max(start, 0), stop)]
+
+    def search(self, text, limit=100):
+        """Newest records containing text, scanned in place with mmap.rfind"""
+        needle = text.encode("utf-8")
+        results = []
+        if not needle:
+            return results
+        with self.lock:
+            end = HEADER.size + self.count * RECORD.size
+            while len(results) < limit:
+                pos = self.map.rfind(needle, HEADER.size, end)
+                if pos < 0:
+                    break
+                index = (pos - HEADER.size) // RECORD.size
+                start = HEADER.size + index * RECORD.size
+                if pos + len(needle) <= start + RECORD.size and pos - start >= 8:
+                    results.append((index, HistoryRecord.unpack_from(self.map, start)))
+                    end = start
+                else:
+                    # Match straddles two records or hit the binary timestamp, look further back
+                    end = pos + len(needle) - 1
+        return results
+
+    def close(self):
+        """Stop the writer and flush the mapping"""
+        if self.writer.is_alive():
+            self.pending.put(None)
+            self.writer.join()
+        with self.lock:
+            if not self.map.closed:
+                self.map.flush()
+                self.map.close()
+                self.file.close()
@@ -0,0 +1,183 @@
+"""Opt-in latency instrumentation and Tk event-loop lag monitor
+
+Nothing here is imported or installed unless metrics are enabled
+(--metrics FILE or CALCULATOR_METRICS), so a normal run pays nothing.
+When enabled, selected methods are replaced on the instance by timing
+wrappers and metrics are exported periodically to FILE: Prometheus text
+format for .prom/.txt, JSON otherwise.
+"""
+import atexit
+import bisect
+import json
+import time
+
+from settings_store import atomic_write
+
+# Histogram upper bounds in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Prometheus label name per metric
+LABEL_NAMES = {"action_latency_seconds": "action", "event_loop_lag_seconds": "loop"}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram"""
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bucket bound containing the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (self.max,), self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.counts))
+        }
+
+
+class Metrics:
+    """Histograms keyed by (metric, label)"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+
+    def observe(self, metric, label, seconds):
+        key = (metric, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    def instrument(self, obj, name, per_action=False):
+        """Replace obj.name with a timing wrapper, per_action labels by the first argument"""
+        original = getattr(obj, name)
+        observe = self.observe
+        clock = time.perf_counter
+
+        if per_action:
+            def wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    observe("action_latency_seconds", f"{name}:{args[0] if args else ''}", clock() - started)
+        else:
+            def wrapper(*args, **kwargs):
+                started = clock()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    observe("action_latency_seconds", name, clock() - started)
+
+        if hasattr(obj, "__dict__"):
+            setattr(obj, name, wrapper)
+        else:
+            # __slots__ instances take no new attributes, give this one a subclass
+            cls = type(obj)
+            obj.__class__ = type(cls.__name__, (cls,),
+                                 {"__slots__": (), name: lambda self, *args, **kwargs: wrapper(*args, **kwargs)})
+        # Dispatch tables hold bound methods captured earlier
+        actions = getattr(obj, "actions", None)
+        if isinstance(actions, dict):
+            for key, action in actions.items():
+                if action == original:
+                    actions[key] = wrapper
+
+    def to_json(self):
+        return json.dumps({
+            "started": self.started,
+            "exported": time.time(),
+            "metrics": {f"{metric}{{{label}}}": histogram.as_dict()
+                        for (metric, label), histogram in sorted(self.histograms.items())}
+        }, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        for metric in sorted({metric for metric, _ in self.histograms}):
+            name = f"calculator_{metric}"
+            label_name = LABEL_NAMES.get(metric, "label")
+            lines.append(f"# TYPE {name} histogram")
+            for (other, label), histogram in sorted(self.histograms.items()):
+                if other != metric:
+                    continue
+                label_text = label.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip([str(b) for b in BUCKETS] + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{label_name}="{label_text}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{label_name}="{label_text}"}} {histogram.total}')
+                lines.append(f'{name}_count{{{label_name}="{label_text}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Atomically write metrics to path"""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        try:
+            with atomic_write(path, prefix=".metrics-") as f:
+                f.write(text)
+        except OSError as e:
+            print(f"❌ Could not export metrics to {path}: {e}")
+
+
+class LagMonitor:
+    """Measures how late window.after ticks fire compared to their schedule"""
+
+    def __init__(self, window, metrics, interval_ms=100):
+        self.window = window
+        self.metrics = metrics
+        self.interval = interval_ms / 1000
+        self.interval_ms = interval_ms
+        self.expected = time.perf_counter() + self.interval
+        window.after(interval_ms, self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        self.metrics.observe("event_loop_lag_seconds", "tk", max(now - self.expected, 0.0))
+        self.expected = now + self.interval
+        self.window.after(self.interval_ms, self.tick)
+
+
+def enable(calculator, path, interval=10.0):
+    """Instrument a running AdvancedCalculator and export metrics every interval seconds"""
+    metrics = Metrics()
+    metrics.instrument(calculator, "button_click", per_action=True)
+    metrics.instrument(calculator, "update_display")
+    metrics.instrument(calculator, "apply_settings")
+    metrics.instrument(calculator.engine, "calculate")
+    metrics.instrument(calculator.engine, "calculate_power")
+    calculator.metrics = metrics
+    calculator.lag_monitor = LagMonitor(calculator.window, metrics)
+
+    def export():
+        metrics.export(path)
+        calculator.window.after(int(interval * 1000), export)
+
+    calculator.window.after(int(interval * 1000), export)
+    atexit.register(metrics.export, path)
+    return metrics
@@ -1,4 +1,7 @@
 # English localization
+language = "english"
+native_name = "English"
+
 translations = {
     "title": "Calculator Plus",
     "power_prompt": "ⁿ (enter power)",
@@ -6,6 +9,18 @@ translations = {
     "language_label": "Language:",
     "theme_label": "Theme:",
     "save_btn": "Save",
+    "history_title": "History",
+    "worksheet_title": "Worksheet",
+    "stats_title": "Statistics",
+    "plot_title": "Plot",
+    "convert_title": "Convert",
+    "unit_length": "Length",
+    "unit_mass": "Mass",
+    "unit_volume": "Volume",
+    "unit_temperature": "Temperature",
+    "unit_data": "Data size",
+    "precision_label": "Precision (digits):",
+    "grouping_label": "Digit grouping",
     "error_division": "Division by zero!",
     "error_input": "Invalid input!",
     
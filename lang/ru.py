@@ -1,4 +1,7 @@
 # Russian localization
+language = "russian"
+native_name = "Русский"
+
 translations = {
     "title": "Калькулятор Плюс",
     "power_prompt": "ⁿ (введите степень)",
@@ -6,6 +9,18 @@ translations = {
     "language_label": "Язык:",
     "theme_label": "Тема:",
     "save_btn": "Сохранить",
+    "history_title": "История",
+    "worksheet_title": "Рабочий лист",
+    "stats_title": "Статистика",
+    "plot_title": "График",
+    "convert_title": "Конвертер",
+    "unit_length": "Длина",
+    "unit_mass": "Масса",
+    "unit_volume": "Объём",
+    "unit_temperature": "Температура",
+    "unit_data": "Объём данных",
+    "precision_label": "Точность (цифр):",
+    "grouping_label": "Разделять разряды",
     "error_division": "Деление на ноль!",
     "error_input": "Некорректный ввод!",
     
@@ -0,0 +1,176 @@
+"""Language catalogs discovered under lang/ and loaded on demand
+
+Every lang/<code>.py defines `translations` and optionally `language` (the
+settings key, default <code>) and `native_name`. Discovery only stats the
+files: names are read from an index cached in the config directory and a
+language module is imported just for the entries whose file changed, so
+adding languages costs neither startup time nor per-keystroke lookups.
+"""
+import importlib
+import json
+import os
+
+from settings_store import atomic_write, config_path
+
+LANG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lang")
+INDEX_FILE = "lang_index.json"
+THEME_NAMES = ("dark", "light", "blue")
+DEFAULT_LANGUAGE = "english"
+
+FALLBACK_LANGUAGES = {
+    "english": {
+        "title": "Calculator Plus",
+        "power_prompt": "ⁿ (enter power)",
+        "settings_title": "Settings",
+        "language_label": "Language:",
+        "theme_label": "Theme:",
+        "save_btn": "Save",
+        "history_title": "History",
+        "worksheet_title": "Worksheet",
+        "stats_title": "Statistics",
+        "plot_title": "Plot",
+        "convert_title": "Convert",
+        "unit_length": "Length",
+        "unit_mass": "Mass",
+        "unit_volume": "Volume",
+        "unit_temperature": "Temperature",
+        "unit_data": "Data size",
+        "precision_label": "Precision (digits):",
+        "grouping_label": "Digit grouping",
+        "error_division": "Division by zero!",
+        "error_input": "Invalid input!"
+    },
+    "russian": {
+        "title": "Калькулятор Плюс",
+        "power_prompt": "ⁿ (введите степень)",
+        "settings_title": "Настройки",
+        "language_label": "Язык:",
+        "theme_label": "Тема:",
+        "save_btn": "Сохранить",
+        "history_title": "История",
+        "worksheet_title": "Рабочий лист",
+        "stats_title": "Статистика",
+        "plot_title": "График",
+        "convert_title": "Конвертер",
+        "unit_length": "Длина",
+        "unit_mass": "Масса",
+        "unit_volume": "Объём",
+        "unit_temperature": "Температура",
+        "unit_data": "Объём данных",
+        "precision_label": "Точность (цифр):",
+        "grouping_label": "Разделять разряды",
+        "error_division": "Деление на ноль!",
+        "error_input": "Некорректный ввод!"
+    }
+}
+FALLBACK_NATIVE_NAMES = {"english": "English", "russian": "Русский"}
+
+
+class Catalog:
+    """Texts of one language with its reverse indexes, built once per switch"""
+
+    def __init__(self, name, texts):
+        self.name = name
+        self.texts = texts
+        self.theme_names = [texts.get(f"theme_{key}", key.title()) for key in THEME_NAMES]
+        self.theme_keys = dict(zip(self.theme_names, THEME_NAMES))
+
+    def get(self, key):
+        return self.texts.get(key, key)
+
+
+class Localization:
+    """Registry of available languages, catalogs are loaded on first use"""
+
+    def __init__(self, directory=LANG_DIR, index_path=None):
+        self.directory = directory
+        self.index_path = index_path or config_path(INDEX_FILE)
+        self.catalogs = {}
+        self.modules = {}  # language key -> module name under lang/
+        self.native_names = {}
+        self.discover()
+        # Native name -> language key, for the settings combobox
+        self.language_keys = {native: name for name, native in self.native_names.items()}
+
+    def discover(self):
+        """Find lang/*.py, refreshing cached index entries whose file changed"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.name.endswith(".py") and not entry.name.startswith("_")]
+        except OSError:
+            entries = []
+        if not entries:
+            self.native_names = dict(FALLBACK_NATIVE_NAMES)
+            return
+
+        index = self.read_index()
+        fresh = {}
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            code = entry.name[:-3]
+            stat = entry.stat()
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            info = index.get(code)
+            if info is None or info.get("stamp") != stamp:
+                info = self.describe(code, stamp)
+                if info is None:
+                    continue
+            fresh[code] = info
+            self.modules[info["language"]] = code
+            self.native_names[info["language"]] = info["native_name"]
+        if fresh != index:
+            self.write_index(fresh)
+
+    def describe(self, code, stamp):
+        """Index entry for lang/<code>.py, imports the module once"""
+        try:
+            module = importlib.import_module(f"lang.{code}")
+            translations = module.translations
+        except (ImportError, SyntaxError, AttributeError) as e:
+            print(f"❌ Could not load language {code}: {e}")
+            return None
+        name = getattr(module, "language", code)
+        native_name = getattr(module, "native_name", translations.get(f"lang_{name}", name))
+        return {"stamp": stamp, "language": name, "native_name": native_name}
+
+    def read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def write_index(self, index):
+        """Atomically replace the cached index, failures only cost a rescan next time"""
+        try:
+            with atomic_write(self.index_path, prefix=".lang-") as f:
+                json.dump(index, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"❌ Could not save language index {self.index_path}: {e}")
+
+    def names(self):
+        """Native names of all languages, sorted"""
+        return sorted(self.native_names.values())
+
+    def native_name(self, name):
+        return self.native_names.get(name, name)
+
+    def language_key(self, native_name, default=DEFAULT_LANGUAGE):
+        return self.language_keys.get(native_name, default)
+
+    def load(self, name):
+        """Catalog for a language key, missing keys fall back to English"""
+        catalog = self.catalogs.get(name)
+        if catalog is None:
+            texts = dict(FALLBACK_LANGUAGES["english"])
+            code = self.modules.get(name)
+            if code is not None:
+                try:
+                    texts.update(importlib.import_module(f"lang.{code}").translations)
+                except (ImportError, SyntaxError, AttributeError) as e:
+                    print(f"❌ Could not load language {code}: {e}")
+                    texts.update(FALLBACK_LANGUAGES.get(name, {}))
+            else:
+                texts.update(FALLBACK_LANGUAGES.get(name, {}))
+            catalog = self.catalogs[name] = Catalog(name, texts)
+        return catalog
@@ -0,0 +1,136 @@
+"""Keystroke macros: record GUI actions to a line file and replay them headless
+
+File format, UTF-8 text:
+
+    # calculator-macro 1 precision=20
+    0	b	7
+    120	k	+
+    95	p	"12.5"
+
+one action per line: milliseconds since the previous action, the source
+(b button, k key, p paste, e typed expression) and the action id, or for
+p/e the text as a JSON string. Replay drives CalculatorEngine directly at
+full speed; rendering (fitting the display text as the GUI would) can be
+throttled to one frame per N actions.
+"""
+import atexit
+import json
+import sys
+import time
+
+from engine import CalculatorEngine, DEFAULT_PRECISION
+
+MAGIC = "# calculator-macro 1"
+SOURCES = {"button": "b", "key": "k", "paste": "p", "expression": "e"}
+TEXT_SOURCES = ("p", "e")
+
+
+class MacroRecorder:
+    """Appends actions to a macro file as they happen"""
+
+    def __init__(self, path, precision=DEFAULT_PRECISION):
+        self.path = path
+        self.file = open(path, "w", encoding="utf-8")
+        self.file.write(f"{MAGIC} precision={precision}\n")
+        self.last = time.monotonic()
+        self.count = 0
+        atexit.register(self.close)
+
+    def record(self, source, payload):
+        now = time.monotonic()
+        delta = int((now - self.last) * 1000)
+        self.last = now
+        kind = SOURCES[source]
+        if kind in TEXT_SOURCES:
+            payload = json.dumps(payload, ensure_ascii=False)
+        self.file.write(f"{delta}\t{kind}\t{payload}\n")
+        self.count += 1
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def read_macro(stream):
+    """(precision, iterator of (kind, payload)) for a macro stream"""
+    header = stream.readline()
+    if not header.startswith(MAGIC):
+        raise ValueError("not a calculator macro file")
+    precision = DEFAULT_PRECISION
+    for field in header[len(MAGIC):].split():
+        name, _, value = field.partition("=")
+        if name == "precision":
+            precision = int(value)
+
+    def actions():
+        for line in stream:
+            _, kind, payload = line.rstrip("\n").split("\t", 2)
+            if kind in TEXT_SOURCES:
+                payload = json.loads(payload)
+            yield kind, payload
+
+    return precision, actions()
+
+
+def render(engine, width=16):
+    """What the GUI would show for the current state"""
+    return engine.display_text(width), engine.label
+
+
+def replay(actions, precision=DEFAULT_PRECISION, render_every=0):
+    """Run actions against a fresh engine, returns (engine, stats dict)"""
+    engine = CalculatorEngine(precision=precision)
+    dispatch = engine.actions
+    count = errors = frames = 0
+    started = time.perf_counter()
+    for kind, payload in actions:
+        if kind == "p":
+            engine.paste(payload)
+        elif kind == "e":
+            engine.evaluate_expression(payload)
+        else:
+            action = dispatch.get(payload)
+            if action is not None:
+                action()
+        count += 1
+        if engine.error:
+            # The GUI shows the error once and clears it
+            errors += 1
+            engine.error = None
+        if render_every and count % render_every == 0:
+            render(engine)
+            frames += 1
+    elapsed = time.perf_counter() - started
+    return engine, {
+        "actions": count,
+        "errors": errors,
+        "frames": frames,
+        "elapsed_s": elapsed,
+        "actions_per_s": count / elapsed if elapsed else float("inf")
+    }
+
+
+def main(path, render_every=0):
+    """CLI entry point: final state as JSON on stdout, throughput on stderr"""
+    try:
+        with open(path, "r", encoding="utf-8") as stream:
+            precision, actions = read_macro(stream)
+            engine, stats = replay(actions, precision, render_every)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not replay {path}: {e}")
+        return 1
+    display, label = render(engine)
+    print(json.dumps({
+        "display": engine.display,
+        "shown": display,
+        "label": label,
+        "operation": engine.operation,
+        "previous_input": engine.previous_input,
+        "power_mode": engine.power_mode,
+        "precision": precision,
+        "actions": stats["actions"],
+        "errors": stats["errors"]
+    }, ensure_ascii=False, indent=2))
+    print(f"Replayed {stats['actions']} actions in {stats['elapsed_s']:.3f} s "
+          f"({stats['actions_per_s']:,.0f} actions/s, {stats['frames']} frames)", file=sys.stderr)
+    return 0
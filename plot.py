@@ -0,0 +1,185 @@
+"""Plot and table mode for f(x) written with the calculator's operators
+
+Sampling runs the compiled expression code (see expression.py) on whole
+float64 arrays. Samples lie on a grid of step 2^k and are cached per tile of
+TILE samples, so panning evaluates only tiles that scrolled into view and
+zooming back to a level already seen costs nothing. Before drawing, samples
+are reduced to one min/max pair per pixel column. The table uses Decimal at
+the calculator's precision instead.
+"""
+import math
+import time
+from decimal import Decimal
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from cache import LRUCache
+from engine import format_result, get_context, result_places
+from expression import (ADD, DIV, LOAD, MUL, NEG, PCT, PUSH, SUB, VAR,
+                        ExpressionError, compiler, execute)
+from vectorized import require_numpy
+
+TILE = 1 << 16
+SAMPLE_COUNTS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def evaluate_array(code, xs):
+    """Run compiled code on a float64 array, invalid results become NaN"""
+    stack = []
+    push, pop = stack.append, stack.pop
+    with np.errstate(all='ignore'):
+        for opcode, arg in code:
+            if opcode == PUSH:
+                push(float(arg))
+            elif opcode == VAR:
+                push(xs)
+            elif opcode == LOAD:
+                raise ExpressionError("Line references are not available in plot mode")
+            elif opcode == NEG:
+                push(np.negative(pop()))
+            elif opcode == PCT:
+                push(np.divide(pop(), 100))
+            else:
+                b = pop()
+                a = pop()
+                if opcode == ADD:
+                    push(np.add(a, b))
+                elif opcode == SUB:
+                    push(np.subtract(a, b))
+                elif opcode == MUL:
+                    push(np.multiply(a, b))
+                elif opcode == DIV:
+                    push(np.divide(a, np.where(np.equal(b, 0), np.nan, b)))
+                else:  # POW
+                    push(np.power(a, b))
+        ys = np.broadcast_to(np.asarray(stack[0], dtype=np.float64), xs.shape)
+        return np.where(np.isfinite(ys), ys, np.nan)
+
+
+class Sampler:
+    """Samples f(x) on cached grid tiles"""
+
+    def __init__(self, text, cache_bytes=256 * 1024 * 1024):
+        require_numpy("Plot mode")
+        self.code = compiler.compile(text)
+        self.cache = LRUCache(maxsize=4096, max_bytes=cache_bytes, sizeof=lambda ys: ys.nbytes)
+        self.evaluated = 0  # samples computed, cache hits excluded
+
+    def tile(self, level, index):
+        """y values of tile `index` on the grid with step 2^level"""
+        key = (level, index)
+        ys = self.cache.get(key)
+        if ys is None:
+            xs = (np.arange(TILE, dtype=np.float64) + index * TILE) * math.ldexp(1.0, level)
+            ys = evaluate_array(self.code, xs)
+            self.cache.put(key, ys)
+            self.evaluated += TILE
+        return ys
+
+    def sample(self, x0, x1, samples):
+        """(first x, step, ys) covering [x0, x1] with about `samples` points"""
+        level = round(math.log2((x1 - x0) / samples))
+        step = math.ldexp(1.0, level)
+        first = math.floor(x0 / step)
+        last = math.ceil(x1 / step)
+        tiles = [self.tile(level, index) for index in range(first // TILE, last // TILE + 1)]
+        ys = tiles[0] if len(tiles) == 1 else np.concatenate(tiles)
+        offset = first - (first // TILE) * TILE
+        return first * step, step, ys[offset:offset + last - first + 1]
+
+
+def decimate(start, step, ys, x0, x1, width):
+    """Per pixel column (min, max) of the samples, NaN where a column has none"""
+    edges = x0 + np.arange(width + 1) * ((x1 - x0) / width)
+    bounds = np.clip(np.ceil((edges - start) / step).astype(np.int64), 0, len(ys))
+    lows, highs = bounds[:-1], bounds[1:]
+    filled = np.flatnonzero(highs > lows)
+    mins = np.full(width, np.nan)
+    maxs = np.full(width, np.nan)
+    if len(filled):
+        # Empty columns have no width, so each segment runs to the next filled column
+        starts = lows[filled]
+        with np.errstate(all='ignore'):
+            mins[filled] = np.fmin.reduceat(ys, starts)
+            maxs[filled] = np.fmax.reduceat(ys, starts)
+            # The last segment would run to the end of ys, cut it at its column
+            segment = ys[lows[filled[-1]]:highs[filled[-1]]]
+            mins[filled[-1]], maxs[filled[-1]] = np.fmin.reduce(segment), np.fmax.reduce(segment)
+    return mins, maxs
+
+
+def plot_points(mins, maxs, y0, y1, height):
+    """Canvas polylines: runs of columns with data, zig-zagging between min and max"""
+    scale = (height - 1) / (y1 - y0) if y1 > y0 else 0.0
+    top = np.clip((y1 - maxs) * scale, -1, height)
+    bottom = np.clip((y1 - mins) * scale, -1, height)
+    lines = []
+    current = []
+    for column, (a, b) in enumerate(zip(top.tolist(), bottom.tolist())):
+        if a != a:  # NaN: gap in the curve
+            if len(current) > 2:
+                lines.append(current)
+            current = []
+            continue
+        current.extend((column, b, column, a) if column % 2 else (column, a, column, b))
+    if len(current) > 2:
+        lines.append(current)
+    return lines
+
+
+def value_range(mins, maxs):
+    """Vertical range of the decimated curve with a small margin"""
+    low, high = np.nanmin(mins), np.nanmax(maxs)
+    if not (math.isfinite(low) and math.isfinite(high)):
+        return -1.0, 1.0
+    if low == high:
+        return low - 1, high + 1
+    margin = (high - low) * 0.05
+    return low - margin, high + margin
+
+
+def render(sampler, x0, x1, samples, width, height):
+    """Everything the canvas needs plus timings in milliseconds"""
+    started = time.perf_counter()
+    evaluated = sampler.evaluated
+    start, step, ys = sampler.sample(x0, x1, max(samples, width))
+    sampled = time.perf_counter()
+    mins, maxs = decimate(start, step, ys, x0, x1, width)
+    if np.isnan(mins).all():
+        y0, y1 = -1.0, 1.0
+    else:
+        y0, y1 = value_range(mins, maxs)
+    lines = plot_points(mins, maxs, y0, y1, height)
+    decimated = time.perf_counter()
+    return {
+        "lines": lines,
+        "y_range": (y0, y1),
+        "samples": len(ys),
+        "evaluated": sampler.evaluated - evaluated,
+        "sample_ms": (sampled - started) * 1000,
+        "decimate_ms": (decimated - sampled) * 1000
+    }
+
+
+def table(text, x0, x1, rows=21, precision=20):
+    """(x, f(x)) text pairs at evenly spaced x, exact Decimal evaluation"""
+    code = compiler.compile(text)
+    context = get_context(precision)
+    places = result_places(precision)
+    x0, x1 = Decimal(x0), Decimal(x1)
+    step = context.divide(x1 - x0, max(rows - 1, 1))
+    results = []
+    for row in range(rows):
+        x = context.add(x0, context.multiply(step, row))
+        try:
+            y = format_result(execute(code, context, x=x), places)
+        except ZeroDivisionError:
+            y = "÷0"
+        except (ValueError, ArithmeticError):
+            y = "—"
+        results.append((format_result(x, places), y))
+    return results
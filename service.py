@@ -0,0 +1,323 @@
+"""Headless calculation service on asyncio, HTTP/JSON and line-delimited JSON
+
+    python calculator.py --serve --port 8765
+    curl -d '{"expression": "2^10 / 3"}' http://127.0.0.1:8765/eval
+    echo '{"op": "÷", "a": "1", "b": "3", "id": 1}' | nc 127.0.0.1 8765
+
+Both protocols share one port: a connection whose first line is an HTTP
+request line is served as HTTP/1.1 (keep-alive unless the client asks to
+close), anything else as NDJSON, one request object per line. A request is
+{"expression": "..."} or {"op": "+", "a": "...", "b": "..."} (the same
+Decimal semantics and formatting as the calculator), optionally with
+"precision" and an "id" that is echoed back; a JSON array is a batch.
+Requests on a connection are pipelined: they are evaluated concurrently and
+answered in order. GET /stats (or {"stats": true}) reports throughput and
+latency percentiles.
+"""
+import asyncio
+import json
+import re
+import sys
+import time
+from collections import deque
+from decimal import Decimal
+
+from batch import ERROR_MESSAGES
+from engine import (DEFAULT_PRECISION, ERROR_INPUT, HEAVY_COST, MAX_PRECISION, RESULT_CACHE,
+                    compute, error_key, estimate_cost, format_result, get_context, result_places)
+from expression import compiler, cost
+
+ALIASES = {'*': '×', '/': '÷', '^': 'xⁿ', '−': '-'}
+KINDS = ('+', '-', '×', '÷', 'xⁿ', '%')
+MAX_BODY = 16 * 1024 * 1024
+PIPELINE_DEPTH = 128
+LATENCY_WINDOW = 10000
+HTTP_REQUEST_LINE = re.compile(rb"^[A-Z]+ \S+ HTTP/1\.[01]\r?\n$")
+CONTENT_LENGTH = re.compile(r"[0-9]+\Z")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 501: "Not Implemented"}
+
+
+def evaluate(request, precision=DEFAULT_PRECISION):
+    """Response dict for one request object"""
+    if not isinstance(request, dict):
+        return {"error": ERROR_MESSAGES[ERROR_INPUT]}
+    response = {"id": request["id"]} if "id" in request else {}
+    try:
+        precision = request.get("precision", precision)
+        if not isinstance(precision, int) or not 1 <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be 1..{MAX_PRECISION}")
+        if "expression" in request:
+            value = compiler.evaluate(str(request["expression"]), get_context(precision))
+            response["result"] = format_result(value, result_places(precision))
+        else:
+            key = job(request, precision)
+            result = RESULT_CACHE.get(key)
+            if result is None:
+                result = compute(*key)
+                RESULT_CACHE.put(key, result)
+            response["result"] = result
+    except (ValueError, ArithmeticError, TypeError, LookupError) as e:
+        response["error"] = ERROR_MESSAGES[error_key(e)]
+    return response
+
+
+def job(request, precision):
+    """compute() arguments for an {"op", "a", "b"} request"""
+    kind = ALIASES.get(request.get("op"), request.get("op"))
+    if kind not in KINDS:
+        raise ValueError(f"unknown op {kind!r}")
+    a = request.get("a")
+    b = request.get("b") if kind != '%' else None
+    if a is None or (b is None and kind != '%'):
+        raise ValueError("missing operand")
+    a = Decimal(str(a))
+    b = Decimal(str(b)) if b is not None else None
+    if not a.is_finite() or (b is not None and not b.is_finite()):
+        raise ValueError("operands must be finite numbers")
+    if kind == '÷' and b == 0:
+        raise ZeroDivisionError("Division by zero")
+    return kind, a, b, precision
+
+
+def is_heavy(request, precision):
+    """Whether a request should leave the event loop for the process pool"""
+    if not isinstance(request, dict):
+        return False
+    precision = request.get("precision", precision)
+    try:
+        if "expression" in request:
+            return cost(compiler.compile(str(request["expression"])), precision) > HEAVY_COST
+        return estimate_cost(*job(request, precision)) > HEAVY_COST
+    except (ValueError, ArithmeticError, TypeError, LookupError):
+        return False
+
+
+def make_pool(workers):
+    """Process pool for heavy requests
+
+    Workers start on first use, inside some connection handler; forked
+    straight from the server they would inherit that client's socket and
+    keep it open after close(), so they come from a fork server instead.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver") if "forkserver" in methods else None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+class CalculationService:
+    """Evaluates requests with bounded concurrency and keeps latency stats"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, max_concurrency=64, workers=1):
+        self.precision = precision
+        self.max_concurrency = max_concurrency
+        self.workers = workers
+        self.semaphore = None
+        self.pool = None
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.last_report = (self.started, 0)
+
+    async def evaluate(self, request):
+        """One request, heavy ones run in worker processes"""
+        started = time.perf_counter()
+        async with self.semaphore:
+            if is_heavy(request, self.precision):
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(self.pool, evaluate, request, self.precision)
+            else:
+                response = evaluate(request, self.precision)
+        self.latencies.append(time.perf_counter() - started)
+        self.requests += 1
+        if "error" in response:
+            self.errors += 1
+        return response
+
+    async def respond(self, body):
+        """Response object for a JSON body: request, batch or stats query"""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            self.errors += 1
+            return {"error": "Invalid JSON"}
+        if isinstance(payload, list):
+            return list(await asyncio.gather(*(self.evaluate(request) for request in payload)))
+        if isinstance(payload, dict) and payload.get("stats"):
+            return self.stats()
+        return await self.evaluate(payload)
+
+    def stats(self):
+        """Throughput since start and latency percentiles over the recent window"""
+        elapsed = time.monotonic() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(q):
+            return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+        return {
+            "uptime_s": round(elapsed, 3),
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections": self.connections,
+            "throughput_rps": round(self.requests / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(0.5), 3),
+            "p99_ms": round(percentile(0.99), 3),
+            "max_concurrency": self.max_concurrency
+        }
+
+    def report(self):
+        """One stats line on stderr, throughput over the interval since the last report"""
+        now = time.monotonic()
+        since, count = self.last_report
+        rate = (self.requests - count) / (now - since) if now > since else 0.0
+        self.last_report = (now, self.requests)
+        stats = self.stats()
+        print(f"Served {stats['requests']} requests ({rate:,.0f} req/s), "
+              f"p50 {stats['p50_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, "
+              f"{stats['errors']} errors", file=sys.stderr)
+
+    async def connection(self, reader, writer):
+        """Sniff the protocol from the first line, then serve the connection"""
+        self.connections += 1
+        try:
+            first = await reader.readline()
+            if HTTP_REQUEST_LINE.match(first):
+                await self.pipeline(self.http_requests(reader, first), writer)
+            else:
+                await self.pipeline(self.ndjson_requests(reader, first), writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def pipeline(self, requests, writer):
+        """Start each request as it arrives and write responses in arrival order"""
+        responses = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+
+        async def write_responses():
+            while True:
+                task = await responses.get()
+                if task is None:
+                    return
+                writer.write(await task)
+                await writer.drain()
+
+        sender = asyncio.create_task(write_responses())
+        try:
+            async for respond in requests:
+                # A full queue stops reading, which pushes back on the client
+                await responses.put(asyncio.create_task(respond))
+        finally:
+            await responses.put(None)
+            await sender
+
+    async def ndjson_requests(self, reader, line):
+        while line:
+            if line.strip():
+                yield self.ndjson_response(line)
+            line = await reader.readline()
+
+    async def ndjson_response(self, line):
+        response = await self.respond(line)
+        return json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    async def http_requests(self, reader, request_line):
+        """Parse pipelined HTTP/1.x requests until the connection is to be closed"""
+        while request_line:
+            if request_line in (b"\r\n", b"\n"):
+                # Blank lines between pipelined requests are ignored
+                request_line = await reader.readline()
+                continue
+            if not HTTP_REQUEST_LINE.match(request_line):
+                yield self.http_response(400, {"error": "Malformed request line"}, False)
+                return
+            method, target, version = request_line.decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+            body = b""
+            if "transfer-encoding" in headers:
+                yield self.http_response(501, {"error": "Chunked bodies are not supported"}, False)
+                return
+            length = headers.get("content-length", "0") or "0"
+            if not CONTENT_LENGTH.match(length):
+                yield self.http_response(400, {"error": f"Invalid Content-Length {length!r}"}, False)
+                return
+            length = int(length)
+            if length > MAX_BODY:
+                yield self.http_response(413, {"error": "Request body too large"}, False)
+                return
+            if length:
+                body = await reader.readexactly(length)
+
+            yield self.http_route(method, target, body, keep_alive)
+            if not keep_alive:
+                return
+            request_line = await reader.readline()
+
+    async def http_route(self, method, target, body, keep_alive):
+        path = target.split("?", 1)[0]
+        if path == "/stats" and method == "GET":
+            return await self.http_response(200, self.stats(), keep_alive)
+        if path in ("/", "/eval"):
+            if method != "POST":
+                return await self.http_response(405, {"error": "Use POST"}, keep_alive)
+            if not body:
+                return await self.http_response(411, {"error": "Request body required"}, keep_alive)
+            return await self.http_response(200, await self.respond(body), keep_alive)
+        return await self.http_response(404, {"error": f"No route {path}"}, keep_alive)
+
+    async def http_response(self, status, payload, keep_alive):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + body
+
+    async def serve(self, host="127.0.0.1", port=8765, socket_path=None, stats_interval=10.0):
+        """Run until cancelled"""
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.pool = make_pool(self.workers)
+        if socket_path:
+            server = await asyncio.start_unix_server(self.connection, socket_path, limit=MAX_BODY)
+            where = socket_path
+        else:
+            server = await asyncio.start_server(self.connection, host, port, limit=MAX_BODY)
+            where = ", ".join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"Serving calculations on {where}", file=sys.stderr)
+        async with server:
+            try:
+                while True:
+                    await asyncio.sleep(stats_interval)
+                    self.report()
+            finally:
+                self.report()
+                if self.pool is not None:
+                    self.pool.shutdown(cancel_futures=True)
+
+
+def main(host="127.0.0.1", port=8765, socket_path=None, precision=DEFAULT_PRECISION,
+         workers=1, max_concurrency=64, stats_interval=10.0):
+    """CLI entry point, stops on Ctrl+C"""
+    service = CalculationService(precision, max_concurrency, workers)
+    try:
+        asyncio.run(service.serve(host, port, socket_path, stats_interval))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"❌ Could not start service: {e}")
+        return 1
+    return 0
@@ -0,0 +1,98 @@
+"""Several independent calculator sessions in one process
+
+A kiosk runs N calculators side by side. Instead of N processes, each
+session is a Toplevel under one hidden Tk root. The Tcl interpreter, the
+themes and their widget options (module level in calculator.py), the
+language catalogs, the settings store and the history log exist once; a
+session owns only its widgets and a slotted CalculatorEngine. Every new
+session reports how much resident memory it added.
+"""
+import os
+import sys
+import tkinter as tk
+
+from history import HistoryLog
+from localization import Localization
+from settings_store import SettingsStore
+
+MIB = 1024 * 1024
+
+
+def rss_bytes():
+    """Resident set size of this process, None where it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS: kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class SessionManager:
+    """Hosts calculator sessions under one hidden Tk root"""
+
+    def __init__(self, factory):
+        self.factory = factory  # AdvancedCalculator, passed in to avoid a circular import
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.localization = Localization()
+        self.settings_store = SettingsStore()
+        try:
+            self.history = HistoryLog()
+        except (OSError, ValueError) as e:
+            print(f"❌ History disabled: {e}")
+            self.history = None
+        self.sessions = []
+        self.root_rss = rss_bytes()
+        self.added = []  # RSS growth per opened session, in bytes
+
+    def open(self, event=None):
+        """Start one more session and report the memory it added"""
+        before = rss_bytes()
+        session = self.factory(self.root, self.localization, self.settings_store, self.history)
+        session.window.protocol("WM_DELETE_WINDOW", lambda: self.close(session))
+        session.window.bind('<Control-n>', self.open)
+        session.window.update_idletasks()
+        after = rss_bytes()
+        self.sessions.append(session)
+        if before is not None and after is not None:
+            self.added.append(after - before)
+            print(f"Session {len(self.sessions)}: +{(after - before) / MIB:.1f} MiB RSS "
+                  f"(process {after / MIB:.1f} MiB)", file=sys.stderr)
+        return session
+
+    def close(self, session):
+        """Close one session, the process ends with the last one"""
+        session.close()
+        self.sessions.remove(session)
+        if not self.sessions:
+            self.root.destroy()
+
+    def report(self):
+        """Average cost of a session next to a standalone process (root plus one session)"""
+        if not self.added or self.root_rss is None:
+            return "RSS not available on this platform"
+        extra = self.added[1:] or self.added
+        average = sum(extra) / len(extra)
+        standalone = self.root_rss + self.added[0]
+        return (f"{len(self.sessions)} sessions in {(self.root_rss + sum(self.added)) / MIB:.1f} MiB: "
+                f"+{average / MIB:.1f} MiB per additional session, a standalone process "
+                f"takes {standalone / MIB:.1f} MiB ({average / standalone:.0%})")
+
+    def run(self, count=1):
+        for _ in range(count):
+            self.open()
+        print(self.report(), file=sys.stderr)
+        self.root.mainloop()
+
+
+def main(factory, count):
+    """CLI entry point for --sessions"""
+    SessionManager(factory).run(max(count, 1))
+    return 0
@@ -0,0 +1,152 @@
+"""Per-user settings file with atomic, debounced writes on a background thread"""
+import atexit
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+APP_NAME = "CalculatorPlus"
+SETTINGS_FILE = "calculator_settings.json"
+SCHEMA_VERSION = 1
+
+# Where settings lived before the per-user location: working directory and app folder
+LEGACY_PATHS = [
+    os.path.abspath(SETTINGS_FILE),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), SETTINGS_FILE)
+]
+
+
+def config_dir():
+    """Per-user configuration directory, CALCULATOR_CONFIG_DIR overrides it"""
+    override = os.environ.get("CALCULATOR_CONFIG_DIR")
+    if override:
+        return override
+    if os.name == 'nt':
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+        return os.path.join(base, APP_NAME)
+    if sys.platform == "darwin":
+        return os.path.join(os.path.expanduser("~"), "Library", "Application Support", APP_NAME)
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "calculator-plus")
+
+
+def config_path(name):
+    """Path of a file in the config directory"""
+    return os.path.join(config_dir(), name)
+
+
+@contextmanager
+def atomic_write(path, prefix=".tmp-", newline=None):
+    """Text file for writing path: a temp file in the same directory, fsynced
+    and renamed over path on success, removed when the block raises
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=prefix, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def migrate(data):
+    """Bring loaded settings up to SCHEMA_VERSION"""
+    version = data.pop("schema", 0)
+    if version > SCHEMA_VERSION:
+        print(f"❌ Settings schema {version} is newer than supported {SCHEMA_VERSION}, unknown keys are kept")
+    # Version 0 (unversioned file) has the same keys as version 1
+    return data
+
+
+class SettingsStore:
+    """Loads settings once and writes changes atomically off the UI thread
+
+    save() only records a snapshot; the writer thread waits until no change
+    has come in for `delay` seconds and then writes it through a temp file
+    and os.replace, so a crash never leaves a half-written file behind.
+    """
+
+    def __init__(self, path=None, delay=0.5):
+        self.path = path or config_path(SETTINGS_FILE)
+        self.delay = delay
+        self.condition = threading.Condition()
+        self.pending = None
+        self.deadline = 0
+        self.closed = False
+        self.last_write_ms = None
+        self.writer = threading.Thread(target=self.write_loop, name="settings-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def read(self, path):
+        """Settings dict from path, None when missing or unreadable"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not read settings {path}: {e}")
+            return None
+        return data if isinstance(data, dict) else None
+
+    def load(self, defaults):
+        """Defaults updated from the user file, falling back to a legacy file"""
+        settings = dict(defaults)
+        for path in [self.path] + LEGACY_PATHS:
+            data = self.read(path)
+            if data is not None:
+                settings.update(migrate(data))
+                if path != self.path:
+                    # Move legacy settings to the per-user location
+                    self.save(settings)
+                break
+        return settings
+
+    def save(self, settings):
+        """Schedule a write, rapid calls are merged into one"""
+        with self.condition:
+            self.pending = dict(settings)
+            self.deadline = time.monotonic() + self.delay
+            self.condition.notify()
+
+    def write_loop(self):
+        """Writer thread: wait for the debounce delay, then write the latest snapshot"""
+        while True:
+            with self.condition:
+                while True:
+                    if self.pending is not None and (self.closed or time.monotonic() >= self.deadline):
+                        break
+                    if self.pending is None and self.closed:
+                        return
+                    timeout = None if self.pending is None else self.deadline - time.monotonic()
+                    self.condition.wait(timeout)
+                settings, self.pending = self.pending, None
+            self.write(settings)
+
+    def write(self, settings):
+        """Atomic write (see atomic_write), failures are reported and skipped"""
+        started = time.perf_counter()
+        try:
+            with atomic_write(self.path, prefix=".settings-") as f:
+                json.dump({"schema": SCHEMA_VERSION, **settings}, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            print(f"❌ Could not save settings {self.path}: {e}")
+            return
+        self.last_write_ms = (time.perf_counter() - started) * 1000
+
+    def close(self):
+        """Write any pending change now and stop the writer"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.writer.is_alive():
+            self.writer.join()
@@ -0,0 +1,329 @@
+"""Statistics mode: single-pass aggregates over memory-mapped numeric files
+
+Sources are CSV/text (one number per line, or a column of a comma-separated
+file) and binary files: .npy arrays and raw little-endian float64 (.f64,
+.bin). The file is mapped and scanned in CHUNK_BYTES pieces, so memory use
+does not grow with its size. Aggregates are count, min/max, mean and
+variance (Welford, merged per chunk), optionally a Decimal sum that is
+exact for the values as written, and quantiles from a log-bucket sketch
+with bounded relative error. numpy speeds up the chunk maths when present.
+"""
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from decimal import Context, Decimal, InvalidOperation, MAX_EMAX, MAX_PREC, MIN_EMIN
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+BINARY_SUFFIXES = (".f64", ".bin")
+FLOAT64 = struct.Struct("<d")
+# Wide enough that adding never rounds
+EXACT_CONTEXT = Context(prec=MAX_PREC, Emax=MAX_EMAX, Emin=MIN_EMIN)
+
+
+class Cancelled(Exception):
+    """Scan stopped through its cancel event"""
+
+
+class RunningStats:
+    """Count, min, max, mean and variance in one pass (Welford / Chan merge)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, count, mean, m2, low, high):
+        """Fold in the aggregates of another batch of values"""
+        if not count:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def add_array(self, values):
+        if len(values):
+            mean = float(values.mean())
+            self.merge(len(values), mean, float(((values - mean) ** 2).sum()),
+                       float(values.min()), float(values.max()))
+
+    def variance(self, sample=True):
+        dof = self.count - 1 if sample else self.count
+        return self.m2 / dof if dof > 0 else 0.0
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch, answers are within relative_accuracy
+
+    Bucket i holds values in (gamma^(i-1), gamma^i]; the number of buckets
+    depends on the range of magnitudes, not on the number of values.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def key(self, magnitude):
+        return math.ceil(math.log(magnitude) / self.log_gamma)
+
+    def add(self, x):
+        self.count += 1
+        if x > 0:
+            key = self.key(x)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif x < 0:
+            key = self.key(-x)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zeros += 1
+
+    def add_array(self, values):
+        self.count += len(values)
+        self.zeros += int((values == 0).sum())
+        for store, part in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if len(part):
+                keys, counts = np.unique(np.ceil(np.log(part) / self.log_gamma).astype(np.int64),
+                                         return_counts=True)
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    store[key] = store.get(key, 0) + count
+
+    def value(self, key):
+        """Representative value of a bucket, relative error at most relative_accuracy"""
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative first: negative buckets by descending magnitude
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self.value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self.value(key)
+        return self.value(max(self.positive)) if self.positive else 0.0
+
+
+def to_float(token):
+    """float of a text token, None for headers and other non-numbers"""
+    try:
+        value = float(token)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def text_chunks(data, column):
+    """Yield (tokens, end offset) from mapped text, cut at line ends"""
+    start = 0
+    size = len(data)
+    while start < size:
+        end = min(start + CHUNK_BYTES, size)
+        if end < size:
+            newline = data.rfind(b"\n", start, end)
+            if newline > start:
+                end = newline + 1
+        lines = data[start:end].splitlines()
+        if column == 0:
+            tokens = [line.split(b",", 1)[0].strip() for line in lines]
+        else:
+            tokens = [fields[column].strip() for fields in (line.split(b",") for line in lines)
+                      if len(fields) > column]
+        yield [token for token in tokens if token], end
+        start = end
+
+
+def scan(path, column=0, exact=False, quantiles=DEFAULT_QUANTILES,
+         progress=None, cancel=None):
+    """Aggregate the numbers in path in one pass
+
+    progress(fraction) is called after every chunk; setting the threading
+    Event `cancel` stops the scan with Cancelled. Returns a dict.
+    """
+    started = time.perf_counter()
+    stats = RunningStats()
+    sketch = QuantileSketch()
+    exact_sum = Decimal(0) if exact else None
+    skipped = 0
+
+    def step(position, total):
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        if progress is not None:
+            progress(position / total if total else 1.0)
+
+    lower = path.lower()
+    if lower.endswith(".npy"):
+        if not HAS_NUMPY:
+            raise RuntimeError(".npy files need numpy: pip install numpy")
+        data = np.load(path, mmap_mode='r')
+        if data.ndim > 1:
+            data = data[:, column]
+        rows = max(CHUNK_BYTES // 8, 1)
+        for start in range(0, len(data), rows):
+            values = np.asarray(data[start:start + rows], dtype=np.float64)
+            finite = values[np.isfinite(values)]
+            skipped += len(values) - len(finite)
+            stats.add_array(finite)
+            sketch.add_array(finite)
+            if exact:
+                exact_sum = sum_exact(exact_sum, finite.tolist())
+            step(start + len(values), len(data))
+    else:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+            try:
+                if lower.endswith(BINARY_SUFFIXES):
+                    chunks = binary_chunks(data)
+                else:
+                    chunks = text_chunks(data, column)
+                for tokens, end in chunks:
+                    skipped += add_chunk(tokens, stats, sketch)
+                    if exact:
+                        exact_sum = sum_exact(exact_sum, tokens)
+                    step(end, size)
+            finally:
+                if size:
+                    data.close()
+
+    result = {
+        "path": path,
+        "count": stats.count,
+        "skipped": skipped,
+        "sum": stats.mean * stats.count,
+        "mean": stats.mean if stats.count else math.nan,
+        "variance": stats.variance(),
+        "stdev": math.sqrt(stats.variance()),
+        "min": stats.min if stats.count else math.nan,
+        "max": stats.max if stats.count else math.nan,
+        "quantiles": {q: sketch.quantile(q) for q in quantiles},
+        "elapsed_s": time.perf_counter() - started
+    }
+    if exact:
+        result["exact_sum"] = exact_sum
+    return result
+
+
+def binary_chunks(data):
+    """Yield (float64 values, end offset) from a mapped raw float64 file"""
+    usable = len(data) - len(data) % FLOAT64.size
+    step = CHUNK_BYTES - CHUNK_BYTES % FLOAT64.size
+    for start in range(0, usable, step):
+        end = min(start + step, usable)
+        if HAS_NUMPY:
+            # Sliced copy, a view would pin the mapping open
+            yield np.frombuffer(data[start:end], dtype="<f8"), end
+        else:
+            yield [value for (value,) in FLOAT64.iter_unpack(data[start:end])], end
+
+
+def add_chunk(tokens, stats, sketch):
+    """Feed text tokens or floats into the accumulators, returns how many were skipped"""
+    if HAS_NUMPY:
+        if isinstance(tokens, list):
+            try:
+                values = np.array(tokens, dtype=np.bytes_).astype(np.float64)
+            except ValueError:
+                values = np.array([v for v in map(to_float, tokens) if v is not None], dtype=np.float64)
+        else:
+            values = tokens
+        finite = values[np.isfinite(values)]
+        stats.add_array(finite)
+        sketch.add_array(finite)
+        return len(tokens) - len(finite)
+    skipped = 0
+    for token in tokens:
+        value = to_float(token) if isinstance(token, bytes) else token
+        if value is None or not math.isfinite(value):
+            skipped += 1
+            continue
+        stats.add(value)
+        sketch.add(value)
+    return skipped
+
+
+def sum_exact(total, values):
+    """Decimal sum of text tokens as written (or floats exactly), non-numbers ignored"""
+    add = EXACT_CONTEXT.add
+    for value in values:
+        try:
+            number = Decimal(value.decode("ascii")) if isinstance(value, bytes) else Decimal(value)
+        except (InvalidOperation, UnicodeDecodeError, ValueError):
+            continue
+        if number.is_finite():
+            total = add(total, number)
+    return total
+
+
+def format_report(result):
+    """Human-readable summary"""
+    lines = [
+        f"count     {result['count']:,}" + (f" ({result['skipped']:,} skipped)" if result['skipped'] else ""),
+        f"sum       {result['sum']:.15g}",
+        f"mean      {result['mean']:.15g}",
+        f"variance  {result['variance']:.15g}",
+        f"stdev     {result['stdev']:.15g}",
+        f"min       {result['min']:.15g}",
+        f"max       {result['max']:.15g}",
+    ]
+    if "exact_sum" in result:
+        lines.append(f"exact sum {result['exact_sum']}")
+    for q, value in result["quantiles"].items():
+        lines.append(f"p{q * 100:g}".ljust(10) + f"{value:.6g}")
+    return "\n".join(lines)
+
+
+def main(path, column=0, exact=False):
+    """CLI entry point, progress and throughput go to stderr"""
+    def progress(fraction):
+        print(f"\r{fraction:6.1%}", end="", file=sys.stderr)
+
+    try:
+        result = scan(path, column, exact, progress=progress if sys.stderr.isatty() else None)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"❌ Could not scan {path}: {e}")
+        return 1
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(format_report(result))
+    rate = result["count"] / result["elapsed_s"] if result["elapsed_s"] else float("inf")
+    print(f"Scanned {result['count']} values in {result['elapsed_s']:.3f} s ({rate:,.0f} values/s)",
+          file=sys.stderr)
+    return 0
@@ -0,0 +1,33 @@
+"""Command line validation: bad values are argparse errors, not tracebacks"""
+import pytest
+
+from calculator import parse_args
+from engine import DEFAULT_PRECISION, MAX_PRECISION
+
+
+def test_defaults():
+    args = parse_args([])
+    assert args.precision == DEFAULT_PRECISION
+    assert args.workers == 1
+
+
+@pytest.mark.parametrize("argv", [
+    ["--precision", "0"],
+    ["--precision", "-5"],
+    ["--precision", str(MAX_PRECISION + 1)],
+    ["--precision", "many"],
+    ["--workers", "0"],
+    ["--chunk-size", "-1"],
+    ["--max-concurrency", "0"],
+    ["--max-concurrency", "-3"],
+])
+def test_out_of_range_values_exit_with_usage(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        parse_args(argv)
+    assert exit_info.value.code == 2
+    assert f"argument {argv[0]}" in capsys.readouterr().err
+
+
+def test_precision_bounds_are_accepted():
+    assert parse_args(["--precision", "1"]).precision == 1
+    assert parse_args(["--precision", str(MAX_PRECISION)]).precision == MAX_PRECISION
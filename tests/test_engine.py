@@ -0,0 +1,148 @@
+"""Headless engine: keystroke sequences, result formatting and pasted text"""
+from decimal import Decimal
+
+import pytest
+
+from cache import LRUCache
+from engine import (ERROR_DIVISION, ERROR_INPUT, GROUP_SEPARATOR, CalculatorEngine, error_key,
+                    format_result, get_context, power)
+
+
+@pytest.fixture
+def engine():
+    return CalculatorEngine(cache=LRUCache(maxsize=0))
+
+
+class ManualWorker:
+    """Job runner stand-in that finishes jobs only when told to"""
+
+    def __init__(self):
+        self.jobs = []
+        self.cancelled = 0
+
+    def submit(self, job, callback):
+        self.jobs.append((job, callback))
+
+    def cancel(self):
+        self.cancelled += 1
+
+
+@pytest.mark.parametrize("keys, display", [
+    ("1+2=", "3"),
+    ("2×3+4=", "10"),
+    ("0.1+0.2=", "0.3"),
+    ("1÷3=", "0.3333333333"),
+    ("12^3=", "1728"),
+    ("2^0.5=", "1.4142135624"),
+    ("3+=", "6"),
+    ("2*/3=", "0.6666666667"),
+    ("50%", "0.5"),
+    ("5±", "-5"),
+    ("123⌫", "12"),
+    ("1.5.2", "1.52"),
+    ("9C", "0"),
+])
+def test_key_sequences(engine, keys, display):
+    assert engine.run(keys) == display
+    assert engine.error is None
+
+
+def test_division_by_zero_clears_with_an_error(engine):
+    assert engine.run("7÷0=") == "0"
+    assert engine.error == ERROR_DIVISION
+
+
+def test_power_label_stays_short(engine):
+    engine.run("2^1000000")
+    assert engine.label == "2ⁿ = 2 × 2 × … × 2 (1,000,000 times)"
+
+
+def test_precision_modes():
+    engine = CalculatorEngine(precision=100)
+    assert engine.run("1÷3=") == "0." + "3" * 90
+    assert engine.run_many(["1+1=", "2^10="]) == ["2", "1024"]
+
+
+@pytest.mark.parametrize("base, exponent, result", [
+    ("0.5", "1e4000000", "0"),
+    ("1", "1e40", "1"),
+    ("-1", "1e40", "1"),
+    ("2", "-2", "0.25"),
+])
+def test_huge_and_negative_exponents(base, exponent, result):
+    assert power(Decimal(base), Decimal(exponent), get_context(20)) == Decimal(result)
+
+
+@pytest.mark.parametrize("base, exponent, error", [
+    ("2", "1e4000000", ERROR_INPUT),
+    ("0", "-1e40", ERROR_DIVISION),
+])
+def test_huge_exponent_errors(base, exponent, error):
+    with pytest.raises(ArithmeticError) as info:
+        power(Decimal(base), Decimal(exponent), get_context(20))
+    assert error_key(info.value) == error
+
+
+def test_heavy_jobs_go_to_the_worker_and_block_input():
+    engine = CalculatorEngine(precision=1000, cache=LRUCache(maxsize=0))
+    engine.worker = ManualWorker()
+    engine.run("2^0.5=")
+    assert engine.busy is not None and len(engine.worker.jobs) == 1
+    engine.run("7")
+    engine.paste("9")
+    engine.evaluate_expression("1+1")
+    assert engine.busy is not None and len(engine.worker.jobs) == 1
+    (_, callback), = engine.worker.jobs
+    callback("1.4142", None)
+    assert engine.busy is None and engine.display == "1.4142"
+
+
+def test_clear_cancels_a_running_job():
+    engine = CalculatorEngine(precision=1000, cache=LRUCache(maxsize=0))
+    engine.worker = ManualWorker()
+    engine.run("2^0.5=")
+    (_, callback), = engine.worker.jobs
+    engine.press("C")
+    assert engine.busy is None and engine.worker.cancelled == 1
+    callback("1.4142", None)
+    assert engine.display == "0"
+
+
+@pytest.mark.parametrize("value, width, text", [
+    ("1e300", None, "1e+300"),
+    ("1e-12", None, "1e-12"),
+    ("123456789.123", 8, "1.235e+8"),
+    ("-0.000001", 16, "-0.000001"),
+])
+def test_format_result_never_goes_through_float(value, width, text):
+    assert format_result(Decimal(value), width=width) == text
+
+
+@pytest.mark.parametrize("value, text", [
+    ("1234567.5", "1 234 567.5"),
+    ("-1000", "-1 000"),
+    ("999", "999"),
+])
+def test_grouping_uses_narrow_spaces(value, text):
+    assert format_result(Decimal(value), width=16, grouping=True) == text.replace(" ", GROUP_SEPARATOR)
+
+
+def test_typed_numbers_are_grouped_as_typed(engine):
+    engine.run("1234567.50")
+    assert engine.display_text(16, grouping=True) == GROUP_SEPARATOR.join(["1", "234", "567.50"])
+
+
+def test_grouped_display_pastes_back_as_the_same_number(engine):
+    engine.run("1234×1000=")
+    engine.paste(engine.display_text(16, grouping=True))
+    assert engine.display == "1234000"
+
+
+def test_grouped_display_edited_into_an_expression(engine):
+    engine.evaluate_expression(format_result(Decimal(1234567), width=16, grouping=True) + "+1")
+    assert engine.display == "1234568"
+
+
+def test_comma_stays_a_decimal_point(engine):
+    engine.paste("1,234")
+    assert Decimal(engine.display) == Decimal("1.234")
@@ -0,0 +1,67 @@
+"""Calculation service: request evaluation and HTTP framing errors"""
+import asyncio
+import json
+
+import pytest
+
+import service
+
+
+def test_evaluate_answers_malformed_requests():
+    assert service.evaluate({"op": "+", "a": "1", "b": "2", "id": 7}) == {"id": 7, "result": "3"}
+    assert "error" in service.evaluate({"op": "+", "a": "1"})
+    assert "error" in service.evaluate({"op": "+", "a": "1", "b": "2", "precision": 0})
+
+
+def exchange(data):
+    """Send raw bytes to a fresh service connection and return everything it answers"""
+    async def run():
+        calculations = service.CalculationService()
+        calculations.semaphore = asyncio.Semaphore(calculations.max_concurrency)
+        server = await asyncio.start_server(calculations.connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(data)
+            await writer.drain()
+            reply = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return reply
+        finally:
+            server.close()
+            await server.wait_closed()
+    return asyncio.run(run())
+
+
+def responses(reply):
+    """(status, connection header, JSON body) per HTTP response in reply"""
+    parsed = []
+    while reply:
+        head, _, rest = reply.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        headers = dict(line.split(": ", 1) for line in lines[1:])
+        length = int(headers["Content-Length"])
+        parsed.append((int(lines[0].split()[1]), headers["Connection"], json.loads(rest[:length])))
+        reply = rest[length:]
+    return parsed
+
+
+def post(body, extra=""):
+    return (f"POST /eval HTTP/1.1\r\nContent-Length: {len(body)}\r\n{extra}\r\n{body}").encode()
+
+
+def test_pipelined_requests_are_answered_in_order():
+    reply = exchange(post('{"expression": "2^10"}') + post('{"expression": "1/4"}', "Connection: close\r\n"))
+    assert [(status, body["result"]) for status, _, body in responses(reply)] == [(200, "1024"), (200, "0.25")]
+
+
+@pytest.mark.parametrize("second", [
+    b"GARBAGE\r\n\r\n",
+    b"POST /eval\r\n\r\n",
+    b"POST /eval HTTP/1.1\r\nContent-Length: ten\r\n\r\n",
+    b"POST /eval HTTP/1.1\r\nContent-Length: -5\r\n\r\n",
+])
+def test_bad_framing_gets_400_and_close(second):
+    reply = responses(exchange(post('{"expression": "1+1"}') + second))
+    assert [(status, connection) for status, connection, _ in reply] == [(200, "keep-alive"), (400, "close")]
+    assert "error" in reply[1][2]
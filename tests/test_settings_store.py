@@ -0,0 +1,35 @@
+"""Atomic writes and settings persistence"""
+import json
+
+import pytest
+
+from settings_store import SettingsStore, atomic_write
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "sub" / "data.txt"
+    with atomic_write(str(path)) as f:
+        f.write("new")
+    assert path.read_text(encoding="utf-8") == "new"
+    assert [p.name for p in path.parent.iterdir()] == ["data.txt"]
+
+
+def test_failed_atomic_write_keeps_the_old_file_and_no_temp(tmp_path):
+    path = tmp_path / "data.txt"
+    path.write_text("old", encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write("partial")
+            raise RuntimeError("interrupted")
+    assert path.read_text(encoding="utf-8") == "old"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.txt"]
+
+
+def test_settings_round_trip(tmp_path):
+    path = tmp_path / "settings.json"
+    store = SettingsStore(str(path), delay=0)
+    store.save({"theme": "light", "precision": 100})
+    store.close()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"schema": 1, "theme": "light", "precision": 100}
+    assert SettingsStore(str(path)).load({"theme": "dark", "grouping": False}) == \
+        {"theme": "light", "precision": 100, "grouping": False}
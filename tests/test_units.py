@@ -0,0 +1,66 @@
+"""Unit registry: parsing, exact affine conversions and column conversion"""
+import io
+from decimal import Decimal
+
+import pytest
+
+import units
+from units import UnitRegistry
+
+
+@pytest.fixture(scope="module")
+def registry():
+    return UnitRegistry.load()
+
+
+@pytest.mark.parametrize("value, source, target, expected", [
+    ("32", "degF", "degC", "0"),
+    ("212", "degF", "degC", "100"),
+    ("0", "degC", "degF", "32"),
+    ("100", "degC", "degF", "212"),
+    ("273.15", "K", "degC", "0"),
+    ("-273.15", "degC", "K", "0"),
+    ("-459.67", "degF", "K", "0"),
+    ("0", "K", "degF", "-459.67"),
+    ("-40", "°F", "°C", "-40"),
+])
+@pytest.mark.parametrize("precision", [28, 100])
+def test_temperature_fixed_points(registry, value, source, target, expected, precision):
+    assert registry.convert(value, source, target, precision) == Decimal(expected)
+
+
+def test_linear_units_and_aliases(registry):
+    assert registry.convert("1", "mile", "km") == Decimal("1.609344")
+    assert registry.convert(1, "ft", "in") == 12
+    assert registry.convert("1", "GiB", "KiB") == 1024 ** 2
+
+
+def test_convert_many_masks_bad_entries(registry):
+    assert registry.convert_many(["32", "x", "", "212"], "degF", "degC") == \
+        [Decimal(0), None, None, Decimal(100)]
+
+
+def test_cross_dimension_and_unknown_units_raise(registry):
+    with pytest.raises(ValueError, match="Cannot convert"):
+        registry.factors("kg", "m")
+    with pytest.raises(ValueError, match="Unknown unit"):
+        registry.factors("parsec", "m")
+
+
+@pytest.mark.parametrize("text, message", [
+    ("m\n", "outside a \\[dimension\\]"),
+    ("[length]\nm\nkm = 1000\n", "expected 'name = factor unit"),
+    ("[length]\nm\nkm = 0 m\n", "must not be zero"),
+    ("[length]\nm\nkm = 1000 g\n", "not a unit of \\[length\\]"),
+    ("[length]\nm\nkm = 1000 cm\ncm\n", "only the first unit"),
+])
+def test_parse_errors_name_the_problem(text, message):
+    with pytest.raises(ValueError, match=message):
+        UnitRegistry().parse(io.StringIO(text))
+
+
+def test_convert_stream_masks_bad_cells():
+    source = io.StringIO("32,x\nwarm\n212\n")
+    target = io.StringIO()
+    assert units.convert_stream(source, target, "degF", "degC") == 3
+    assert target.getvalue().splitlines() == ["0", units.MASKED_TEXT, "100"]
@@ -0,0 +1,57 @@
+"""Column mode: masking of bad cells and CLI error handling"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vectorized  # noqa: E402
+from engine import MASKED_TEXT  # noqa: E402
+
+ROWS = "a,b\n1,2\n3\n,4\nx,5\n6,0\n"
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "in.csv"
+    path.write_text(ROWS, encoding="utf-8")
+    return str(path)
+
+
+def cells(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.parametrize("precision", [None, 20])
+def test_bad_cells_are_masked(source, tmp_path, precision):
+    target = str(tmp_path / "out.csv")
+    assert vectorized.process_file("÷", source, target, precision=precision) == 6
+    result = cells(target)
+    assert result[0] == result[2] == result[3] == result[4] == result[5] == MASKED_TEXT
+    assert float(result[1]) == 0.5
+
+
+def test_scalar_with_header(source, tmp_path):
+    target = str(tmp_path / "out.csv")
+    vectorized.process_file("+", source, target, scalar="2", precision=20)
+    assert cells(target) == [MASKED_TEXT, "3", "5", MASKED_TEXT, MASKED_TEXT, "8"]
+
+
+@pytest.mark.parametrize("op, name, scalar", [
+    ("?", "in.csv", None),
+    ("+", "missing.csv", None),
+    ("+", "in.csv", "x"),
+])
+def test_main_reports_errors_and_keeps_the_target(source, tmp_path, capsys, op, name, scalar):
+    target = tmp_path / "out.csv"
+    target.write_text("old\n", encoding="utf-8")
+    assert vectorized.main(op, str(tmp_path / name), str(target), scalar=scalar) == 1
+    assert "❌ Could not process" in capsys.readouterr().out
+    assert target.read_text(encoding="utf-8") == "old\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["in.csv", "out.csv"]
+
+
+def test_npy_needs_a_second_column(tmp_path):
+    source = str(tmp_path / "one.npy")
+    np.save(source, np.arange(3.0))
+    with pytest.raises(ValueError, match="1 column"):
+        vectorized.process_file("+", source, str(tmp_path / "out.npy"))
@@ -0,0 +1,218 @@
+"""Conversion mode: offline unit registry with precomputed conversion paths
+
+Units come from units.txt (format described there). Every definition is an
+edge of a graph between units of one dimension; loading walks that graph
+once from each base unit and stores, per unit, the exact affine map to the
+base (value × scale + offset, as Fractions). A pair's map is composed from
+the two and cached as Decimals for the requested precision in the form
+(value + shift) × scale, so converting a value is a multiply, plus one
+addition for affine units. The shift is the source value of the target's
+zero (32 for °F -> °C), which keeps that zero exact.
+"""
+import csv
+import os
+import sys
+from collections import deque
+from decimal import Decimal, InvalidOperation
+from fractions import Fraction
+
+from cache import LRUCache
+from engine import (DEFAULT_PRECISION, MASKED_TEXT, format_result, get_context, result_places,
+                    to_decimal)
+
+UNITS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "units.txt")
+# Extra digits of the cached factors and the shifted value, the final multiply rounds to the precision
+GUARD_DIGITS = 5
+
+
+class UnitRegistry:
+    """Units by dimension with their exact maps to the base unit"""
+
+    def __init__(self):
+        self.dimensions = {}  # dimension -> unit names in file order
+        self.dimension_of = {}
+        self.to_base = {}  # unit -> (scale, offset): base value = value × scale + offset
+        self.names = {}  # unit name or alias -> unit name
+        self.pairs = LRUCache(maxsize=1024)
+
+    @classmethod
+    def load(cls, path=UNITS_FILE):
+        """Registry from a units file, ValueError names the offending line"""
+        registry = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            registry.parse(f, path)
+        return registry
+
+    def parse(self, lines, source="<units>"):
+        """Read definitions, then resolve every unit against its base"""
+        edges = {}  # unit -> [(neighbour, scale, offset)], neighbour value = value × scale + offset
+        bases = {}
+        dimension = None
+        for number, line in enumerate(lines, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            where = f"{source}:{number}"
+            if line.startswith("[") and line.endswith("]"):
+                dimension = line[1:-1].strip()
+                if dimension in self.dimensions:
+                    raise ValueError(f"{where}: dimension {dimension!r} defined twice")
+                self.dimensions[dimension] = []
+                continue
+            if dimension is None:
+                raise ValueError(f"{where}: unit outside a [dimension] section")
+            tokens = line.split()
+            name = tokens[0]
+            if name in self.dimension_of:
+                raise ValueError(f"{where}: unit {name!r} defined twice")
+            self.dimension_of[name] = dimension
+            self.dimensions[dimension].append(name)
+            edges.setdefault(name, [])
+            if len(tokens) > 1 and tokens[1] == "=":
+                try:
+                    scale = Fraction(tokens[2])
+                    reference = tokens[3]
+                    offset = Fraction(0)
+                    aliases = tokens[4:]
+                    if aliases and aliases[0] in ("+", "-"):
+                        offset = Fraction(aliases[1]) * (-1 if aliases[0] == "-" else 1)
+                        aliases = aliases[2:]
+                except (IndexError, ValueError, ZeroDivisionError):
+                    raise ValueError(f"{where}: expected 'name = factor unit [+|- offset]'") from None
+                if not scale:
+                    raise ValueError(f"{where}: factor must not be zero")
+                edges[name].append((reference, scale, offset))
+                edges.setdefault(reference, []).append((name, 1 / scale, -offset / scale))
+            else:
+                if self.dimensions[dimension][0] != name:
+                    raise ValueError(f"{where}: only the first unit of [{dimension}] may omit '= factor unit'")
+                bases[dimension] = name
+                aliases = tokens[1:]
+            for alias in (name, *aliases):
+                if self.names.get(alias, name) != name:
+                    raise ValueError(f"{where}: {alias!r} already names {self.names[alias]!r}")
+                self.names[alias] = name
+
+        for dimension, units in self.dimensions.items():
+            if dimension not in bases:
+                raise ValueError(f"{source}: [{dimension}] has no units")
+            for unit in units:
+                for neighbour, _, _ in edges[unit]:
+                    if self.dimension_of.get(neighbour) != dimension:
+                        raise ValueError(f"{source}: {unit!r} refers to {neighbour!r}, "
+                                         f"which is not a unit of [{dimension}]")
+            self.resolve(bases[dimension], edges)
+            missing = [unit for unit in units if unit not in self.to_base]
+            if missing:
+                raise ValueError(f"{source}: {', '.join(missing)} not connected to {bases[dimension]!r}")
+
+    def resolve(self, base, edges):
+        """Breadth-first walk from the base composing each unit's map to it"""
+        self.to_base[base] = (Fraction(1), Fraction(0))
+        queue = deque([base])
+        while queue:
+            unit = queue.popleft()
+            scale, offset = self.to_base[unit]
+            for neighbour, edge_scale, edge_offset in edges[unit]:
+                # Edges map unit -> neighbour; walking outward needs neighbour -> unit
+                if neighbour not in self.to_base:
+                    inverse = 1 / edge_scale
+                    self.to_base[neighbour] = (inverse * scale, offset - edge_offset * inverse * scale)
+                    queue.append(neighbour)
+
+    def unit(self, name):
+        """Unit name for a name or alias"""
+        try:
+            return self.names[name.strip()]
+        except KeyError:
+            raise ValueError(f"Unknown unit {name!r}") from None
+
+    def factors(self, source, target, precision=DEFAULT_PRECISION):
+        """(scale, shift) Decimals with target value = (value + shift) × scale"""
+        key = (source, target, precision)
+        pair = self.pairs.get(key)
+        if pair is None:
+            source, target = self.unit(source), self.unit(target)
+            if self.dimension_of[source] != self.dimension_of[target]:
+                raise ValueError(f"Cannot convert {self.dimension_of[source]} ({source}) "
+                                 f"to {self.dimension_of[target]} ({target})")
+            source_scale, source_offset = self.to_base[source]
+            target_scale, target_offset = self.to_base[target]
+            scale = source_scale / target_scale
+            shift = (source_offset - target_offset) / source_scale
+            context = get_context(precision + GUARD_DIGITS)
+            pair = tuple(context.divide(Decimal(part.numerator), Decimal(part.denominator))
+                         for part in (scale, shift))
+            self.pairs.put(key, pair)
+        return pair
+
+    def convert(self, value, source, target, precision=DEFAULT_PRECISION):
+        """Convert one value (Decimal, int or numeric string)"""
+        scale, shift = self.factors(source, target, precision)
+        value = to_decimal(value)
+        if shift:
+            value = get_context(precision + GUARD_DIGITS).add(value, shift)
+        return get_context(precision).multiply(value, scale)
+
+    def convert_many(self, values, source, target, precision=DEFAULT_PRECISION):
+        """Convert a column of values, entries that are not numbers become None"""
+        scale, shift = self.factors(source, target, precision)
+        add = get_context(precision + GUARD_DIGITS).add
+        multiply = get_context(precision).multiply
+        results = []
+        for value in values:
+            try:
+                value = to_decimal(value)
+                results.append(multiply(add(value, shift) if shift else value, scale))
+            except (InvalidOperation, ValueError, TypeError):
+                results.append(None)
+        return results
+
+
+_registry = None
+
+
+def registry():
+    """Process-wide registry loaded from UNITS_FILE on first use"""
+    global _registry
+    if _registry is None:
+        _registry = UnitRegistry.load()
+    return _registry
+
+
+def convert_stream(source, target, units_from, units_to, column=0,
+                   precision=DEFAULT_PRECISION, chunk_size=10_000):
+    """Convert one CSV column from source to target file objects, returns the row count"""
+    units = registry()
+    places = result_places(precision)
+    reader = csv.reader(source)
+    writer = csv.writer(target)
+    rows = 0
+    while True:
+        chunk = [row[column] if len(row) > column else "" for _, row in zip(range(chunk_size), reader)]
+        if not chunk:
+            return rows
+        results = units.convert_many(chunk, units_from, units_to, precision)
+        writer.writerows([MASKED_TEXT if value is None else format_result(value, places)]
+                         for value in results)
+        rows += len(chunk)
+
+
+def main(units_from, units_to, source=None, target=None, column=0, precision=DEFAULT_PRECISION):
+    """CLI entry point: column of source (default stdin) to target (default stdout)"""
+    f_in = f_out = None
+    try:
+        registry().factors(units_from, units_to, precision)
+        f_in = open(source, "r", newline="", encoding="utf-8") if source else sys.stdin
+        f_out = open(target, "w", newline="", encoding="utf-8") if target else sys.stdout
+        rows = convert_stream(f_in, f_out, units_from, units_to, column, precision)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not convert: {e}", file=sys.stderr)
+        return 1
+    finally:
+        for f in (f_in, f_out):
+            if f is not None and f not in (sys.stdin, sys.stdout):
+                f.close()
+    if target:
+        print(f"Wrote {rows} rows to {os.path.abspath(target)}")
+    return 0
@@ -0,0 +1,105 @@
+import importlib.util
+import json
+import os
+import threading
+import time
+
+from settings_store import config_path
+
+# requests and packaging are heavy, they are only imported when a check actually runs
+HAS_DEPENDENCIES = all(importlib.util.find_spec(name) is not None
+                       for name in ("requests", "packaging"))
+if not HAS_DEPENDENCIES:
+    print("❌ Missing dependencies: requests, packaging")
+
+CURRENT_VERSION = "v1.1.0"
+# Overridable so the check can be pointed at a local stand-in server
+GITHUB_URL = os.environ.get("CALCULATOR_UPDATE_URL",
+                            "https://api.github.com/repos/Irkindia/calculator-plus/releases/latest")
+CACHE_FILE = "calculator_update_cache.json"
+CACHE_TTL = 24 * 60 * 60  # seconds between real requests
+
+
+class UpdateChecker:
+    """GitHub release check with an on-disk TTL/ETag cache"""
+
+    def __init__(self, url=GITHUB_URL, cache_path=None, ttl=CACHE_TTL,
+                 current_version=CURRENT_VERSION, timeout=5):
+        self.url = url
+        self.cache_path = cache_path or config_path(CACHE_FILE)
+        self.ttl = ttl
+        self.current_version = current_version
+        self.timeout = timeout
+
+    def load_cache(self):
+        """Load last check result, empty dict if missing or broken"""
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            return cache if isinstance(cache, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save_cache(self, cache):
+        """Persist last check result"""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+        except OSError:
+            pass
+
+    def fetch_release(self):
+        """Return latest release info, hitting the network only when the cache is stale"""
+        cache = self.load_cache()
+        if cache and time.time() - cache.get("checked_at", 0) < self.ttl:
+            return cache.get("release")
+
+        import requests
+
+        headers = {}
+        if cache.get("etag"):
+            headers["If-None-Match"] = cache["etag"]
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+
+        if response.status_code == 304:
+            # Not modified, reuse cached release and restart the TTL
+            cache["checked_at"] = time.time()
+        elif response.status_code == 200:
+            latest_release = response.json()
+            cache = {
+                "checked_at": time.time(),
+                "etag": response.headers.get("ETag"),
+                "release": {
+                    "tag_name": latest_release["tag_name"],
+                    "body": latest_release.get("body") or ""
+                }
+            }
+        else:
+            return None
+
+        self.save_cache(cache)
+        return cache.get("release")
+
+    def check(self):
+        """Check for updates, return message text or None"""
+        if not HAS_DEPENDENCIES:
+            return None
+        try:
+            from packaging import version
+
+            release = self.fetch_release()
+            if release:
+                latest_version = release["tag_name"]
+                if version.parse(latest_version) > version.parse(self.current_version):
+                    return f"🎉 Update available {latest_version}!\n{release['body']}\n\nDownload: https://github.com/Irkindia/calculator-plus"
+            return None
+        except Exception:
+            return None
+
+    def check_async(self, callback):
+        """Run check() on a daemon thread and pass the result to callback (called on that thread)"""
+        thread = threading.Thread(target=lambda: callback(self.check()),
+                                  name="update-check", daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,238 @@
+"""Column mode: one calculator operator applied to whole arrays
+
+Operators are the calculator buttons: '+', '-', '×', '÷', '%' and 'xⁿ'.
+For two columns '%' means "b percent of a" (a × b / 100). Results are
+numpy masked arrays; entries the single-value path would reject
+(division by zero, invalid powers) are masked, and so are input cells
+that are not numbers (a header row, empty or missing cells).
+"""
+import csv
+import os
+from itertools import islice
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from engine import (DEFAULT_PRECISION, MASKED_TEXT, format_result, make_context, power,
+                    result_places, to_decimal)
+from settings_store import atomic_write
+
+OPERATORS = ('+', '-', '×', '÷', '%', 'xⁿ')
+ALIASES = {'*': '×', '/': '÷', '^': 'xⁿ'}
+
+
+def require_numpy(feature="Column mode"):
+    """Fail with an install hint when numpy is missing"""
+    if not HAS_NUMPY:
+        raise RuntimeError(f"{feature} needs numpy: pip install numpy")
+
+
+def check_operator(op):
+    """Canonical operator symbol"""
+    op = ALIASES.get(op, op)
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown operator {op!r}, expected one of {' '.join(OPERATORS)}")
+    return op
+
+
+def exact_value(value):
+    """Finite Decimal for a number, None (masked) for anything else"""
+    if value is None:
+        return None
+    try:
+        value = to_decimal(value)
+    except (ArithmeticError, ValueError, TypeError):
+        return None
+    return value if value.is_finite() else None
+
+
+def float_values(cells):
+    """float64 array of CSV cells, NaN (masked) where a cell is not a number"""
+    try:
+        return np.array(cells, dtype=np.float64)
+    except ValueError:
+        pass
+    values = np.empty(len(cells), dtype=np.float64)
+    for i, cell in enumerate(cells):
+        try:
+            values[i] = float(cell)
+        except ValueError:
+            values[i] = np.nan
+    return values
+
+
+def apply_float(op, a, b):
+    """float64 path, masks division by zero and non-finite results"""
+    require_numpy()
+    op = check_operator(op)
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        if op == '+':
+            result = a + b
+        elif op == '-':
+            result = a - b
+        elif op == '×':
+            result = a * b
+        elif op == '÷':
+            result = a / b
+        elif op == '%':
+            result = a * b / 100
+        else:
+            result = np.power(a, b)
+    mask = ~np.isfinite(result)
+    if op == '÷':
+        mask |= np.broadcast_to(b == 0, result.shape)
+    return np.ma.masked_array(result, mask=mask)
+
+
+def decimal_operation(op, precision):
+    """Element function for the exact path, returns None where the result is masked"""
+    context = make_context(precision)
+    simple = {
+        '+': context.add,
+        '-': context.subtract,
+        '×': context.multiply
+    }
+
+    def compute(a, b):
+        if a is None or b is None:
+            return None
+        try:
+            if op in simple:
+                return simple[op](a, b)
+            if op == '÷':
+                return context.divide(a, b) if b != 0 else None
+            if op == '%':
+                return context.divide(context.multiply(a, b), 100)
+            return power(a, b, context)
+        except (ValueError, ArithmeticError):
+            return None
+    return compute
+
+
+def apply_exact(op, a, b, precision=DEFAULT_PRECISION):
+    """Object/Decimal path with the calculator's precision"""
+    require_numpy()
+    op = check_operator(op)
+    convert = np.frompyfunc(exact_value, 1, 1)
+    a = convert(np.asarray(a, dtype=object))
+    b = convert(np.asarray(b, dtype=object))
+    result = np.frompyfunc(decimal_operation(op, precision), 2, 1)(a, b)
+    result = np.asarray(result, dtype=object)
+    return np.ma.masked_array(result, mask=np.equal(result, None))
+
+
+def apply(op, a, b, precision=None):
+    """Apply op elementwise to arrays/scalars, exact when precision is given"""
+    if precision is None:
+        return apply_float(op, a, b)
+    return apply_exact(op, a, b, precision)
+
+
+def format_values(result, precision=None):
+    """Result array as CSV cells"""
+    places = result_places(precision) if precision else None
+    cells = []
+    for value, masked in zip(result.data.ravel(), np.ma.getmaskarray(result).ravel()):
+        if masked:
+            cells.append(MASKED_TEXT)
+        elif places is None:
+            cells.append(repr(float(value)))
+        else:
+            cells.append(format_result(value, places))
+    return cells
+
+
+def read_csv_chunks(path, columns, chunk_size, exact=False):
+    """Yield lists of selected columns, chunk_size rows at a time, missing cells read as empty"""
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            picked = [[row[c] if len(row) > c else "" for row in rows] for c in columns]
+            if exact:
+                yield [np.array([exact_value(v) for v in column], dtype=object) for column in picked]
+            else:
+                yield [float_values(column) for column in picked]
+
+
+def read_npy_chunks(path, columns, chunk_size):
+    """Yield column slices of a memory-mapped .npy file"""
+    data = np.load(path, mmap_mode='r')
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    for start in range(0, data.shape[0], chunk_size):
+        block = data[start:start + chunk_size]
+        yield [np.asarray(block[:, c]) for c in columns]
+
+
+def process_file(op, source, target, scalar=None, columns=(0, 1),
+                 chunk_size=100_000, precision=None):
+    """Apply op to columns of source (CSV or .npy) and write target chunk by chunk
+
+    With scalar given only the first column is read and combined with it.
+    A .npy target stores float64 with NaN in masked slots and needs a .npy
+    source; CSV targets write MASKED_TEXT for masked cells and replace the
+    target only once every row is written. Returns the number of rows
+    processed.
+    """
+    require_numpy()
+    op = check_operator(op)
+    columns = columns[:1] if scalar is not None else columns[:2]
+    source_npy = source.lower().endswith(".npy")
+    target_npy = target.lower().endswith(".npy")
+    if target_npy and (not source_npy or precision is not None):
+        raise ValueError(".npy output needs a .npy source and the float64 path")
+
+    if source_npy:
+        shape = np.load(source, mmap_mode='r').shape
+        width = shape[1] if len(shape) > 1 else 1
+        if max(columns) >= width:
+            raise ValueError(f"{source} has {width} column(s), {op} without --scalar needs two")
+        chunks = read_npy_chunks(source, columns, chunk_size)
+    else:
+        chunks = read_csv_chunks(source, columns, chunk_size, exact=precision is not None)
+    if scalar is not None:
+        number = exact_value(scalar)
+        if number is None:
+            raise ValueError(f"scalar {scalar!r} is not a number")
+        scalar = number if precision is not None else float(number)
+
+    rows = 0
+    if target_npy:
+        length = np.load(source, mmap_mode='r').shape[0]
+        out = np.lib.format.open_memmap(target, mode='w+', dtype=np.float64, shape=(length,))
+        for chunk in chunks:
+            b = scalar if scalar is not None else chunk[1]
+            result = apply(op, chunk[0], b)
+            out[rows:rows + len(result)] = result.filled(np.nan)
+            rows += len(result)
+        out.flush()
+        return rows
+
+    with atomic_write(target, prefix=".column-", newline="") as f:
+        writer = csv.writer(f)
+        for chunk in chunks:
+            b = scalar if scalar is not None else chunk[1]
+            result = apply(op, chunk[0], b, precision)
+            writer.writerows([cell] for cell in format_values(result, precision))
+            rows += len(result)
+    return rows
+
+
+def main(op, source, target, scalar=None, chunk_size=100_000, precision=None):
+    """CLI entry point"""
+    try:
+        rows = process_file(op, source, target, scalar=scalar,
+                            chunk_size=chunk_size, precision=precision)
+    except (OSError, RuntimeError, ValueError, ArithmeticError) as e:
+        print(f"❌ Could not process {source}: {e}")
+        return 1
+    print(f"Wrote {rows} rows to {os.path.abspath(target)}")
+    return 0
@@ -0,0 +1,71 @@
+"""Runs heavy engine jobs in a worker process so the Tk loop stays responsive
+
+Decimal arithmetic holds the GIL, so a thread would still freeze the window;
+a single worker process does the math instead. Cancelling terminates that
+process, the next job starts a fresh one. Results come back through a queue
+that the Tk thread polls with after() while a job is in flight.
+"""
+import atexit
+import queue
+
+from engine import compute, error_key
+
+POLL_MS = 30
+
+
+class JobRunner:
+    """Worker for CalculatorEngine.worker: submit(job, callback) and cancel()"""
+
+    def __init__(self, window, on_done=None):
+        self.window = window
+        self.on_done = on_done
+        self.pool = None
+        self.results = queue.Queue()
+        self.pending = {}
+        self.generation = 0
+        self.polling = False
+        atexit.register(self.shutdown)
+
+    def submit(self, job, callback):
+        """Run compute(*job) in the worker, callback(result, error) runs on the Tk thread"""
+        if self.pool is None:
+            # Created on first use so startup does not pay for the process
+            import multiprocessing
+            self.pool = multiprocessing.Pool(1)
+        self.generation += 1
+        ticket = self.generation
+        self.pending[ticket] = callback
+        self.pool.apply_async(compute, job,
+                              callback=lambda result: self.results.put((ticket, result, None)),
+                              error_callback=lambda exc: self.results.put((ticket, None, exc)))
+        if not self.polling:
+            self.polling = True
+            self.window.after(POLL_MS, self.poll)
+
+    def poll(self):
+        """Deliver finished jobs, keep polling only while some are pending"""
+        while True:
+            try:
+                ticket, result, exc = self.results.get_nowait()
+            except queue.Empty:
+                break
+            callback = self.pending.pop(ticket, None)
+            if callback is None:
+                continue
+            callback(result, error_key(exc) if exc is not None else None)
+            if self.on_done:
+                self.on_done()
+        if self.pending:
+            self.window.after(POLL_MS, self.poll)
+        else:
+            self.polling = False
+
+    def cancel(self):
+        """Abandon all jobs and kill the worker process"""
+        self.pending.clear()
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool = None
+
+    def shutdown(self):
+        self.cancel()
@@ -0,0 +1,141 @@
+"""Worksheet: numbered expression lines that can use earlier results (#3)
+
+Every line keeps its compiled code, the lines it reads and the lines that
+read it. Editing a line recomputes only its downstream lines, smallest line
+number first (references only point backwards, so that is a topological
+order), and stops propagating wherever a result did not change.
+"""
+import heapq
+
+from engine import ERROR_INPUT, DEFAULT_PRECISION, error_key, format_result, get_context, result_places
+from expression import compiler, execute, references
+from settings_store import SettingsStore, config_path
+
+WORKSHEET_FILE = "calculator_worksheet.json"
+
+
+class Worksheet:
+    """Expression lines with incremental recalculation, line numbers start at 1"""
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        self.clear()
+        self.set_precision(precision)
+
+    def clear(self):
+        """Remove all lines"""
+        self.texts = []
+        self.codes = []  # compiled code, None for empty or malformed lines
+        self.values = {}  # line number -> Decimal, only lines with a result
+        self.results = []  # formatted result or None
+        self.errors = []  # error key or None
+        self.reads = []  # line -> set of lines it references
+        self.readers = []  # line -> set of lines referencing it
+
+    def __len__(self):
+        return len(self.texts)
+
+    def set_precision(self, precision):
+        """Change precision and recompute every line"""
+        self.precision = precision
+        self.context = get_context(precision)
+        self.places = result_places(precision)
+        return self.recompute(range(1, len(self.texts) + 1))
+
+    def set_line(self, number, text):
+        """Replace line `number` (len + 1 appends), returns the recomputed line numbers"""
+        if not 1 <= number <= len(self.texts) + 1:
+            raise IndexError(number)
+        if number > len(self.texts):
+            for items in (self.texts, self.codes, self.results, self.errors, self.reads):
+                items.append(None)
+            self.readers.append(set())
+        index = number - 1
+
+        for line in self.reads[index] or ():
+            self.readers[line - 1].discard(number)
+        self.texts[index] = text
+        try:
+            code = compiler.compile(text) if text.strip() else None
+        except ValueError:
+            code = None
+        reads = references(code) if code else set()
+        self.codes[index], self.reads[index] = code, reads
+        for line in reads:
+            if 1 <= line < number:
+                self.readers[line - 1].add(number)
+        return self.recompute([number])
+
+    def append(self, text):
+        return self.set_line(len(self.texts) + 1, text)
+
+    def evaluate(self, number):
+        """(value, error) of one line from the current values"""
+        code = self.codes[number - 1]
+        if code is None:
+            return None, ERROR_INPUT if self.texts[number - 1].strip() else None
+        if any(not 1 <= line < number for line in self.reads[number - 1]):
+            # Only earlier lines may be referenced, which keeps the graph acyclic
+            return None, ERROR_INPUT
+        try:
+            return execute(code, self.context, self.values), None
+        except (ValueError, ArithmeticError) as e:
+            return None, error_key(e)
+
+    def store(self, number, value, error):
+        """Save a line's result, returns whether it changed"""
+        index = number - 1
+        if value is None:
+            changed = self.values.pop(number, None) is not None or self.errors[index] != error
+            self.results[index] = None
+        else:
+            old = self.values.get(number)
+            changed = old is None or old != value or old.as_tuple() != value.as_tuple()
+            self.values[number] = value
+            if changed or self.results[index] is None:
+                self.results[index] = format_result(value, self.places)
+        self.errors[index] = error
+        return changed
+
+    def recompute(self, start):
+        """Recompute the given lines and whatever reads a changed result, in line order"""
+        queue = list(start)
+        heapq.heapify(queue)
+        queued = set(queue)
+        done = []
+        while queue:
+            number = heapq.heappop(queue)
+            value, error = self.evaluate(number)
+            done.append(number)
+            if self.store(number, value, error):
+                for reader in self.readers[number - 1]:
+                    if reader not in queued:
+                        queued.add(reader)
+                        heapq.heappush(queue, reader)
+        return done
+
+    def row(self, number):
+        """Display text of one line"""
+        index = number - 1
+        text = self.texts[index]
+        if self.results[index] is not None:
+            return f"{number}: {text} = {self.results[index]}"
+        if self.errors[index]:
+            return f"{number}: {text} = ⚠"
+        return f"{number}: {text}"
+
+    def to_dict(self):
+        return {"lines": list(self.texts)}
+
+    def load_dict(self, data):
+        """Replace all lines, returns the number of lines loaded"""
+        lines = data.get("lines", []) if isinstance(data, dict) else []
+        self.clear()
+        for text in lines:
+            if isinstance(text, str):
+                self.append(text)
+        return len(self.texts)
+
+
+def open_store():
+    """Debounced atomic writer for the worksheet file next to the settings"""
+    return SettingsStore(config_path(WORKSHEET_FILE))